@@ -0,0 +1,30 @@
+"""Add composite forecast/reorder indexes
+
+Revision ID: 7c33b7c0ec43
+Revises: 63299f57d02f
+Create Date: 2026-10-14 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c33b7c0ec43'
+down_revision: Union[str, Sequence[str], None] = '63299f57d02f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_forecast_store_horizon_date', 'forecast_results', ['store_id', 'forecast_horizon', 'forecast_date'], unique=False)
+    op.create_index('ix_reorder_active', 'reorder_recommendations', ['store_id', 'is_active', 'urgency'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reorder_active', table_name='reorder_recommendations')
+    op.drop_index('ix_forecast_store_horizon_date', table_name='forecast_results')
@@ -0,0 +1,33 @@
+"""Cover reorder list columns in ix_reorder_active
+
+Revision ID: 99d66e923932
+Revises: 7c33b7c0ec43
+Create Date: 2026-10-14 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '99d66e923932'
+down_revision: Union[str, Sequence[str], None] = '7c33b7c0ec43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_reorder_active', table_name='reorder_recommendations')
+    op.create_index(
+        'ix_reorder_active', 'reorder_recommendations', ['store_id', 'is_active', 'urgency'], unique=False,
+        postgresql_include=['id', 'sku_id', 'reorder_qty', 'reason', 'forecasted_demand', 'current_stock', 'velocity_change_pct']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reorder_active', table_name='reorder_recommendations')
+    op.create_index('ix_reorder_active', 'reorder_recommendations', ['store_id', 'is_active', 'urgency'], unique=False)
@@ -1,21 +1,88 @@
+import hashlib
+import logging
+import time
 from datetime import datetime
-from typing import Optional, List
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, BackgroundTasks
-from sqlalchemy.orm import Session
+from typing import Dict, Optional, List, Tuple
 
-from app.models import get_db, Store, SKU, ForecastResult, create_tables
+import anyio
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, BackgroundTasks, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only, selectinload
+
+from app.models import (
+    get_db, db_session, SessionLocal, Store, SKU, ForecastResult, ReorderRecommendation,
+    Festival, ForecastModel, UrgencyLevel, create_tables
+)
 from app.schemas import (
     CSVUploadResponse, 
     ForecastRequest, ForecastResponse, ForecastResultSchema,
     ReorderListResponse, ReorderSummary, ReorderItem,
     StoreResponse, SKUResponse, StockUpdateRequest,
     FestivalCreate, FestivalResponse,
-    ForecastModelType
+    ForecastModelType, UrgencyLevel as UrgencyLevelType
 )
 from app.services import CSVUploadService, ForecasterService, ReorderService
+from app.services.cache import cache_get, cache_set
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Routes that touch the (synchronous) database or other blocking I/O are
+# plain `def` so FastAPI runs them in its threadpool instead of blocking
+# the event loop; only pure in-memory handlers stay `async def`. CSV
+# ingestion is the exception: it runs on its own capacity-limited worker
+# threads so long uploads can't tie up the shared threadpool.
+
+
+# ORM enum -> response enum, resolved once instead of per serialized row
+_MODEL_ENUM_MAP = {m: ForecastModelType(m.value) for m in ForecastModel}
+_URGENCY_ENUM_MAP = {u: UrgencyLevelType(u.value) for u in UrgencyLevel}
+
+
+# ============== Store Lookup Cache ==============
+
+# store_id -> (expires_at, (pk, name)), per process: entries expire after
+# STORE_LOOKUP_CACHE_TTL because clears in one worker never reach the others
+STORE_LOOKUP_CACHE_SIZE = 1024
+_store_lookup_cache: Dict[str, Tuple[float, Tuple[int, str]]] = {}
+
+
+def _resolve_store_pk(store_id: str) -> Tuple[int, str]:
+    """
+    Resolve a public store_id to its (primary key, name).
+    
+    Misses raise LookupError so they are never cached - a store created
+    by a later upload resolves on its next request.
+    """
+    now = time.monotonic()
+    hit = _store_lookup_cache.get(store_id)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    
+    db = SessionLocal()
+    try:
+        row = db.query(Store.id, Store.name).filter(Store.store_id == store_id).first()
+    finally:
+        db.close()
+    
+    if row is None:
+        raise LookupError(store_id)
+    if len(_store_lookup_cache) >= STORE_LOOKUP_CACHE_SIZE:
+        _store_lookup_cache.clear()
+    _store_lookup_cache[store_id] = (now + settings.STORE_LOOKUP_CACHE_TTL, (row.id, row.name))
+    return row.id, row.name
+
+
+def _get_store_or_404(store_id: str) -> Tuple[int, str]:
+    """Cached store lookup for routes that only need the store's pk and name."""
+    try:
+        return _resolve_store_pk(store_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Store not found")
+
 
 # ============== Health & Init ==============
 
@@ -26,17 +93,55 @@ async def health():
 
 
 @router.post("/init-db")
-async def initialize_database():
+def initialize_database():
     """Initialize database tables."""
     try:
         create_tables()
+        _store_lookup_cache.clear()
         return {"success": True, "message": "Database tables created"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============== HTTP Caching ==============
+
+# Slow-changing reference data the dashboard polls
+HTTP_CACHE_MAX_AGE = 60
+
+
+def _make_etag(*parts) -> str:
+    """Strong ETag from whatever identifies the current version of a resource."""
+    return '"%s"' % hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Return a 304 if the client already holds this version, otherwise
+    attach the caching headers to the outgoing response and return None.
+    """
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={HTTP_CACHE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip() for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 # ============== CSV Upload ==============
 
+_upload_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_upload_limiter() -> anyio.CapacityLimiter:
+    """Created on first use; anyio limiters need a running event loop."""
+    global _upload_limiter
+    if _upload_limiter is None:
+        _upload_limiter = anyio.CapacityLimiter(settings.UPLOAD_CONCURRENCY)
+    return _upload_limiter
+
+
 @router.post("/upload-sales", response_model=CSVUploadResponse)
 async def upload_sales(
     file: UploadFile = File(...),
@@ -52,36 +157,72 @@ async def upload_sales(
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
+    # At most UPLOAD_CONCURRENCY uploads parse at once; the rest wait here
+    # without holding a threadpool slot other requests need
+    return await anyio.to_thread.run_sync(
+        _ingest_upload, file, background_tasks, db,
+        limiter=_get_upload_limiter()
+    )
+
+
+def _ingest_upload(
+    file: UploadFile,
+    background_tasks: Optional[BackgroundTasks],
+    db: Session
+) -> CSVUploadResponse:
+    """Blocking body of upload_sales: size check, parse/insert, pipeline hand-off."""
+    size = file.size
+    if size is None:
+        size = file.file.seek(0, 2)
+        file.file.seek(0)
+    if size > settings.MAX_CSV_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"CSV too large ({size // (1024 * 1024)} MB); limit is {settings.MAX_CSV_BYTES // (1024 * 1024)} MB"
+        )
+    
     try:
-        content = await file.read()
-        content_str = content.decode('utf-8')
-        
+        # Parse straight from the spooled upload rather than holding
+        # the raw bytes and a decoded copy in memory at once
         service = CSVUploadService(db)
-        result = service.process_csv(content_str)
+        result = service.process_csv(file.file)
+        
+        # Uploads create stores on the fly
+        _store_lookup_cache.clear()
         
         # Auto-trigger pipeline if successful
         if result.success and result.store_id:
             def run_full_pipeline(store_id: str):
-                # Create new session for background task
-                db_bg = next(get_db())
                 try:
-                    # 1. Forecast
-                    forecaster = ForecasterService(db_bg)
-                    forecasts = forecaster.forecast_store(store_id, horizon=7)
-                    forecaster.save_forecasts(store_id, forecasts, horizon=7)
-                    
-                    # 2. Reorder
-                    reorder = ReorderService(db_bg)
-                    recs = reorder.generate_recommendations(store_id, horizon=7)
-                    reorder.save_recommendations(store_id, recs)
-                    print(f"Pipeline completed for {store_id}")
+                    # Own session scope for the background task
+                    with db_session() as db_bg:
+                        # 1. Forecast
+                        forecaster = ForecasterService(db_bg)
+                        forecasts = forecaster.forecast_store(store_id, horizon=7)
+                        forecaster.save_forecasts(store_id, forecasts, horizon=7)
+                        
+                        # 2. Reorder
+                        reorder = ReorderService(db_bg)
+                        recs = reorder.generate_recommendations(store_id, horizon=7, forecasts=forecasts)
+                        reorder.save_recommendations(store_id, recs)
+                    logger.info(f"Pipeline completed for {store_id}")
                 except Exception as e:
-                    print(f"Pipeline failed: {e}")
-                finally:
-                    db_bg.close()
-
-            if background_tasks:
-                background_tasks.add_task(run_full_pipeline, result.store_id)
+                    logger.warning(f"Pipeline failed for {store_id}: {e}")
+
+            try:
+                # Hand off to the Celery workers so a big upload never
+                # starves this web process of request handling; no publish
+                # retries, so a dead broker fails fast into the fallback
+                from app.tasks import run_pipeline_async
+                run_pipeline_async.apply_async(
+                    kwargs={"store_id": result.store_id, "horizon": 7}, retry=False
+                )
+            except Exception as e:
+                # Broker unreachable (e.g. local dev without Redis):
+                # fall back to an in-process background task
+                logger.warning(f"Failed to queue pipeline ({e}), running in-process")
+                if background_tasks:
+                    background_tasks.add_task(run_full_pipeline, result.store_id)
         
         return result
         
@@ -93,35 +234,49 @@ async def upload_sales(
 
 # ============== Stores ==============
 
+# Columns StoreResponse actually serializes (skips updated_at)
+_STORE_RESPONSE_COLUMNS = (Store.id, Store.store_id, Store.name, Store.location, Store.created_at)
+
+
 @router.get("/stores", response_model=List[StoreResponse])
-async def list_stores(db: Session = Depends(get_db)):
+def list_stores(request: Request, response: Response, db: Session = Depends(get_db)):
     """List all stores."""
-    stores = db.query(Store).all()
+    # Version the list by a cheap aggregate so revalidation skips the load
+    count, last_updated = db.query(func.count(Store.id), func.max(Store.updated_at)).one()
+    not_modified = _not_modified(request, response, _make_etag("stores", count, last_updated))
+    if not_modified:
+        return not_modified
+    
+    stores = db.query(Store).options(load_only(*_STORE_RESPONSE_COLUMNS)).all()
     return stores
 
 
 @router.get("/stores/{store_id}", response_model=StoreResponse)
-async def get_store(store_id: str, db: Session = Depends(get_db)):
+def get_store(store_id: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get a specific store."""
-    store = db.query(Store).filter(Store.store_id == store_id).first()
+    store = db.query(Store).options(
+        load_only(*_STORE_RESPONSE_COLUMNS, Store.updated_at)
+    ).filter(Store.store_id == store_id).first()
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
+    
+    not_modified = _not_modified(request, response, _make_etag("store", store.id, store.updated_at))
+    if not_modified:
+        return not_modified
     return store
 
 
 @router.get("/stores/{store_id}/skus", response_model=List[SKUResponse])
-async def list_store_skus(store_id: str, db: Session = Depends(get_db)):
+def list_store_skus(store_id: str, db: Session = Depends(get_db)):
     """List all SKUs for a store."""
-    store = db.query(Store).filter(Store.store_id == store_id).first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+    store_pk, _ = _get_store_or_404(store_id)
     
-    skus = db.query(SKU).filter(SKU.store_id == store.id).all()
+    skus = db.query(SKU).filter(SKU.store_id == store_pk).all()
     return skus
 
 
 @router.post("/stores/{store_id}/update-stock")
-async def update_stock(
+def update_stock(
     store_id: str,
     updates: List[StockUpdateRequest],
     db: Session = Depends(get_db)
@@ -130,29 +285,31 @@ async def update_stock(
     Update current stock levels for SKUs.
     Store owners should do this weekly for accurate recommendations.
     """
-    store = db.query(Store).filter(Store.store_id == store_id).first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+    store_pk, _ = _get_store_or_404(store_id)
     
-    updated = 0
-    for update in updates:
-        sku = db.query(SKU).filter(
-            SKU.sku_id == update.sku_id,
-            SKU.store_id == store.id
-        ).first()
-        
-        if sku:
-            sku.current_stock = update.current_stock
-            updated += 1
+    # One SELECT to resolve every SKU, then a single bulk UPDATE by primary key
+    requested_ids = {u.sku_id for u in updates}
+    existing = dict(db.query(SKU.sku_id, SKU.id).filter(
+        SKU.store_id == store_pk,
+        SKU.sku_id.in_(requested_ids)
+    ).all()) if requested_ids else {}
+    
+    mappings = [
+        {"id": existing[u.sku_id], "current_stock": u.current_stock}
+        for u in updates if u.sku_id in existing
+    ]
+    
+    if mappings:
+        db.bulk_update_mappings(SKU, mappings)
     
     db.commit()
-    return {"updated": updated, "total": len(updates)}
+    return {"updated": len(mappings), "total": len(updates)}
 
 
 # ============== Forecasting ==============
 
 @router.post("/run-forecast")
-async def run_forecast(
+def run_forecast(
     request: ForecastRequest,
     background_tasks: bool = Query(False, description="Run in background (async)"),
     db: Session = Depends(get_db)
@@ -163,9 +320,7 @@ async def run_forecast(
     This generates predictions for the next N days.
     If background_tasks=True, runs via Celery/Redis.
     """
-    store = db.query(Store).filter(Store.store_id == request.store_id).first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+    _get_store_or_404(request.store_id)
     
     if background_tasks:
         try:
@@ -196,9 +351,13 @@ async def run_forecast(
     # Save forecasts
     saved_count = service.save_forecasts(request.store_id, forecasts, request.horizon)
     
-    # Also regenerate reorder recommendations immediately for sync requests
+    # Also regenerate reorder recommendations immediately for sync requests,
+    # from these forecasts when they cover every SKU
     reorder_service = ReorderService(db)
-    recommendations = reorder_service.generate_recommendations(request.store_id, request.horizon)
+    recommendations = reorder_service.generate_recommendations(
+        request.store_id, request.horizon,
+        forecasts=None if request.sku_ids else forecasts
+    )
     reorder_service.save_recommendations(request.store_id, recommendations)
     
     return {
@@ -212,57 +371,65 @@ async def run_forecast(
 
 
 @router.get("/get-forecast", response_model=ForecastResponse)
-async def get_forecast(
+def get_forecast(
     store_id: str,
     horizon: int = Query(default=7, ge=1, le=30),
     sku_id: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get forecasts for a store or specific SKU."""
-    store = db.query(Store).filter(Store.store_id == store_id).first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+    store_pk, _ = _get_store_or_404(store_id)
     
-    # Query forecast results
-    query = db.query(ForecastResult).filter(
-        ForecastResult.store_id == store.id,
+    # Query plain column tuples joined with their SKU: one round trip,
+    # no N+1 and no ORM instance hydration per forecast row
+    query = db.query(
+        SKU.sku_id,
+        SKU.sku_name,
+        ForecastResult.forecast_date,
+        ForecastResult.predicted_units,
+        ForecastResult.confidence_lower,
+        ForecastResult.confidence_upper,
+        ForecastResult.model_used,
+        ForecastResult.generated_at
+    ).join(
+        SKU, SKU.id == ForecastResult.sku_id
+    ).filter(
+        ForecastResult.store_id == store_pk,
         ForecastResult.forecast_horizon == horizon
     )
-    
+
     if sku_id:
-        sku = db.query(SKU).filter(
-            SKU.sku_id == sku_id,
-            SKU.store_id == store.id
-        ).first()
-        if sku:
-            query = query.filter(ForecastResult.sku_id == sku.id)
-    
-    results = query.order_by(ForecastResult.forecast_date).all()
-    
-    # Build response
+        query = query.filter(SKU.sku_id == sku_id)
+
+    rows = query.order_by(ForecastResult.forecast_date).all()
+
+    # Build response (rows come straight from typed DB columns, so skip
+    # re-validating them with model_construct)
     forecasts = []
     total_predicted = 0
+    sku_totals = {}  # sku_id -> (sku_name, predicted units), for the insights
     generated_at = datetime.utcnow()
-    
-    for r in results:
-        sku = db.query(SKU).filter(SKU.id == r.sku_id).first()
-        forecasts.append(ForecastResultSchema(
-            sku_id=sku.sku_id if sku else "unknown",
-            sku_name=sku.sku_name if sku else "Unknown",
+
+    for r in rows:
+        forecasts.append(ForecastResultSchema.model_construct(
+            sku_id=r.sku_id,
+            sku_name=r.sku_name,
             forecast_date=r.forecast_date,
             predicted_units=r.predicted_units,
             confidence_lower=r.confidence_lower,
             confidence_upper=r.confidence_upper,
-            model_used=ForecastModelType(r.model_used.value)
+            model_used=_MODEL_ENUM_MAP[r.model_used]
         ))
         total_predicted += r.predicted_units
+        sku_total = sku_totals.get(r.sku_id)
+        sku_totals[r.sku_id] = (r.sku_name, (sku_total[1] if sku_total else 0) + r.predicted_units)
         generated_at = r.generated_at
     
-    # Generate insights
+    # Generate insights from the totals summed above, not a second pass
     service = ForecasterService(db)
-    insights = service.generate_insights_from_schema(forecasts)
+    insights = service.generate_insights_from_totals(total_predicted, sku_totals)
     
-    return ForecastResponse(
+    response = ForecastResponse.model_construct(
         store_id=store_id,
         horizon=horizon,
         generated_at=generated_at,
@@ -270,12 +437,15 @@ async def get_forecast(
         forecasts=forecasts,
         insights=insights
     )
+    # Returning a Response directly stops FastAPI from re-validating the
+    # whole payload against response_model (which stays for the docs)
+    return ORJSONResponse(response.model_dump())
 
 
 # ============== Reorder List (THE MONEY ENDPOINT) ==============
 
 @router.get("/get-reorder-list", response_model=ReorderListResponse)
-async def get_reorder_list(
+def get_reorder_list(
     store_id: str,
     horizon: int = Query(default=7, ge=1, le=30),
     regenerate: bool = Query(default=True),
@@ -289,9 +459,7 @@ async def get_reorder_list(
     
     Must be understandable in 10 seconds.
     """
-    store = db.query(Store).filter(Store.store_id == store_id).first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+    store_pk, store_name = _get_store_or_404(store_id)
     
     service = ReorderService(db)
     
@@ -301,67 +469,92 @@ async def get_reorder_list(
         service.save_recommendations(store_id, recommendations)
     else:
         # Load from database
-        from app.models import ReorderRecommendation, UrgencyLevel
-        recs = db.query(ReorderRecommendation).filter(
-            ReorderRecommendation.store_id == store.id,
+        recs = db.query(ReorderRecommendation).options(
+            load_only(
+                ReorderRecommendation.sku_id,
+                ReorderRecommendation.reorder_qty,
+                ReorderRecommendation.reason,
+                ReorderRecommendation.urgency,
+                ReorderRecommendation.forecasted_demand,
+                ReorderRecommendation.current_stock,
+                ReorderRecommendation.velocity_change_pct
+            ),
+            selectinload(ReorderRecommendation.sku).load_only(SKU.sku_id, SKU.sku_name)
+        ).filter(
+            ReorderRecommendation.store_id == store_pk,
             ReorderRecommendation.is_active == True
         ).all()
         
+        # Typed DB columns, so build items without re-validating them
         recommendations = []
         for r in recs:
-            sku = db.query(SKU).filter(SKU.id == r.sku_id).first()
-            recommendations.append(ReorderItem(
+            sku = r.sku
+            recommendations.append(ReorderItem.model_construct(
                 sku_id=sku.sku_id if sku else "unknown",
                 sku_name=sku.sku_name if sku else "Unknown",
                 reorder_qty=r.reorder_qty,
                 reason=r.reason,
-                urgency=r.urgency.value,
+                urgency=_URGENCY_ENUM_MAP[r.urgency],
                 forecasted_demand=r.forecasted_demand,
                 current_stock=r.current_stock,
                 velocity_change_pct=r.velocity_change_pct
             ))
     
-    return ReorderListResponse(
-        store_id=store_id,
-        store_name=store.name,
-        generated_at=datetime.utcnow(),
-        total_items=len(recommendations),
-        critical_items=sum(1 for r in recommendations if r.urgency.value == 'critical'),
-        items=recommendations
-    )
+    header = {
+        "store_id": store_id,
+        "store_name": store_name,
+        "generated_at": datetime.utcnow(),
+        "total_items": len(recommendations),
+        "critical_items": sum(1 for r in recommendations if r.urgency == UrgencyLevelType.CRITICAL),
+    }
+    
+    # One orjson pass over the already built list; returning a Response
+    # directly skips re-validating it against response_model
+    return ORJSONResponse(header | {"items": [r.model_dump() for r in recommendations]})
 
 
 @router.get("/reorder-summary", response_model=ReorderSummary)
-async def get_reorder_summary(
+def get_reorder_summary(
     store_id: str,
     db: Session = Depends(get_db)
 ):
     """Quick summary of pending reorder recommendations."""
-    store = db.query(Store).filter(Store.store_id == store_id).first()
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+    _get_store_or_404(store_id)
+    
+    # Polled by the dashboard; invalidated by ReorderService.save_recommendations
+    cache_key = f"reorder-summary:{store_id}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
     
     service = ReorderService(db)
     summary = service.get_summary(store_id)
     
     if not summary:
-        return ReorderSummary(total_items=0, critical=0, high=0, medium=0, low=0)
+        summary = ReorderSummary(total_items=0, critical=0, high=0, medium=0, low=0)
     
+    cache_set(cache_key, summary.model_dump(), ttl=settings.REORDER_SUMMARY_CACHE_TTL)
     return summary
 
 
 # ============== Festivals (Seasonality) ==============
 
 @router.get("/festivals", response_model=List[FestivalResponse])
-async def list_festivals(db: Session = Depends(get_db)):
+def list_festivals(request: Request, response: Response, db: Session = Depends(get_db)):
     """List all configured festivals."""
+    # Festivals are only ever added, so count + newest row identify the set
+    count, last_created = db.query(func.count(Festival.id), func.max(Festival.created_at)).one()
+    not_modified = _not_modified(request, response, _make_etag("festivals", count, last_created))
+    if not_modified:
+        return not_modified
+    
     from app.services.festivals import FestivalService
     service = FestivalService(db)
     return service.get_all_festivals()
 
 
 @router.post("/festivals/seed")
-async def seed_festivals(
+def seed_festivals(
     year: int = Query(default=2026, ge=2020, le=2030),
     db: Session = Depends(get_db)
 ):
@@ -376,7 +569,7 @@ async def seed_festivals(
 
 
 @router.post("/festivals", response_model=FestivalResponse)
-async def add_festival(
+def add_festival(
     festival: FestivalCreate,
     db: Session = Depends(get_db)
 ):
@@ -392,7 +585,7 @@ async def add_festival(
 
 
 @router.get("/festivals/impact")
-async def get_festival_impact(
+def get_festival_impact(
     date: str = Query(..., description="Date in YYYY-MM-DD format"),
     db: Session = Depends(get_db)
 ):
@@ -405,8 +598,13 @@ async def get_festival_impact(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    service = FestivalService(db)
-    multiplier = service.get_impact_multiplier(target_date)
+    # Invalidated by FestivalService whenever festivals change
+    cache_key = f"festival-impact:{target_date.isoformat()}"
+    multiplier = cache_get(cache_key)
+    if multiplier is None:
+        service = FestivalService(db)
+        multiplier = service.get_impact_multiplier(target_date)
+        cache_set(cache_key, multiplier, ttl=settings.FESTIVAL_IMPACT_CACHE_TTL)
     
     return {
         "date": date,
@@ -418,7 +616,7 @@ async def get_festival_impact(
 # ============== External Market Integrations ==============
 
 @router.get("/mandi-prices")
-async def get_mandi_prices(
+def get_mandi_prices(
     commodity: Optional[str] = None,
     state: Optional[str] = None
 ):
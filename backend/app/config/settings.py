@@ -3,7 +3,7 @@ Application settings and configuration.
 """
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -12,17 +12,36 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "postgresql://localhost:5432/retail_demand"
     
+    # Connection pool (PostgreSQL only; ignored for SQLite)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_APPLICATION_NAME: str = "kirana-api"
+    DB_SSLMODE: Optional[str] = None  # e.g. "require"
+    
     # Redis (for Celery)
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Response cache (Redis, best effort)
+    CACHE_ENABLED: bool = True
+    REORDER_SUMMARY_CACHE_TTL: int = 60  # seconds
+    FESTIVAL_IMPACT_CACHE_TTL: int = 6 * 3600  # festival dates barely change
+    STORE_LOOKUP_CACHE_TTL: int = 30  # in-process store_id -> pk memo
+    
     # Forecasting defaults
     DEFAULT_FORECAST_HORIZON: int = 7
     MIN_DATA_DAYS_ARIMA: int = 60
     MIN_DATA_DAYS_MOVING_AVG: int = 30
     SAFETY_STOCK_MULTIPLIER: float = 1.2
+    # ARIMA(2, d, 2) fit: statsmodels' MLE, "numba" for the JIT-compiled
+    # Hannan-Rissanen/CSS kernel (faster; forecasts close but not identical)
+    # or "statsforecast" (needs the package). Unusable fits use statsmodels
+    ARIMA_BACKEND: Literal["statsmodels", "numba", "statsforecast"] = "statsmodels"
     
     # API
     API_PREFIX: str = "/api"
+    MAX_CSV_BYTES: int = 200 * 1024 * 1024  # upload size cap
+    UPLOAD_CONCURRENCY: int = 2  # CSV uploads parsed at the same time
     
     # External APIs
     OGD_INDIA_API_KEY: Optional[str] = None
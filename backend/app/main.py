@@ -5,6 +5,7 @@ A decision engine for kirana stores to know what to reorder, how much, and when.
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api import routes
 from app.config.settings import settings
@@ -12,7 +13,8 @@ from app.config.settings import settings
 app = FastAPI(
     title="Retail Demand Prediction System",
     description="Help kirana stores know what to reorder, how much, and when",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend
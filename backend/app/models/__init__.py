@@ -4,11 +4,11 @@ from app.models.models import (
     ForecastResult, ReorderRecommendation, Festival,
     ForecastModel, UrgencyLevel
 )
-from app.models.database import get_db, create_tables, SessionLocal, engine
+from app.models.database import get_db, db_session, create_tables, SessionLocal, engine
 
 __all__ = [
     "Base", "Store", "SKU", "SalesTransaction",
     "ForecastResult", "ReorderRecommendation", "Festival",
     "ForecastModel", "UrgencyLevel",
-    "get_db", "create_tables", "SessionLocal", "engine"
+    "get_db", "db_session", "create_tables", "SessionLocal", "engine"
 ]
@@ -2,9 +2,10 @@
 Database connection and session management.
 """
 
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Generator, Iterator
 
 from app.config.settings import settings
 from app.models.models import Base
@@ -13,12 +14,28 @@ from app.models.models import Base
 is_sqlite = settings.DATABASE_URL.startswith("sqlite")
 
 # Create engine with appropriate settings
-connect_args = {"check_same_thread": False} if is_sqlite else {}
+if is_sqlite:
+    connect_args = {"check_same_thread": False}
+    pool_args = {}
+else:
+    connect_args = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_SSLMODE:
+        connect_args["sslmode"] = settings.DB_SSLMODE
+    # LIFO checkout keeps a hot subset of connections warm instead of
+    # cycling through every idle one; recycle before server-side timeouts
+    pool_args = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_use_lifo": True,
+    }
+
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=not is_sqlite,
     echo=False,
-    connect_args=connect_args
+    connect_args=connect_args,
+    **pool_args
 )
 
 # Session factory
@@ -40,6 +57,27 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+@contextmanager
+def db_session() -> Iterator[Session]:
+    """
+    Transactional session scope for code running outside a request
+    (background tasks, workers). Commits on success, rolls back on error
+    and always returns the connection to the pool.
+    Usage:
+        with db_session() as db:
+            ...
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def create_tables():
     """Create all database tables."""
     Base.metadata.create_all(bind=engine)
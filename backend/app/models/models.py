@@ -13,7 +13,7 @@ Tables:
 from datetime import datetime, date
 from sqlalchemy import (
     Column, Integer, String, Float, Date, DateTime, 
-    ForeignKey, Boolean, Text, Enum as SQLEnum
+    ForeignKey, Boolean, Text, Index, Enum as SQLEnum
 )
 from sqlalchemy.orm import relationship, declarative_base
 import enum
@@ -102,9 +102,13 @@ class ForecastResult(Base):
     Forecasts are regenerated, not edited.
     """
     __tablename__ = "forecast_results"
+    __table_args__ = (
+        # Matches get_forecast: WHERE store_id, forecast_horizon ORDER BY forecast_date
+        Index("ix_forecast_store_horizon_date", "store_id", "forecast_horizon", "forecast_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     sku_id = Column(Integer, ForeignKey("skus.id"), nullable=False, index=True)
     forecast_date = Column(Date, nullable=False, index=True)  # The date being forecasted
     predicted_units = Column(Float, nullable=False)
@@ -125,9 +129,20 @@ class ReorderRecommendation(Base):
     THIS IS THE PRODUCT - the output a kirana owner uses.
     """
     __tablename__ = "reorder_recommendations"
+    __table_args__ = (
+        # Matches the active-list lookups: WHERE store_id, is_active (grouped by urgency).
+        # On PostgreSQL the INCLUDEd columns make the reorder list an index-only scan
+        Index(
+            "ix_reorder_active", "store_id", "is_active", "urgency",
+            postgresql_include=[
+                "id", "sku_id", "reorder_qty", "reason",
+                "forecasted_demand", "current_stock", "velocity_change_pct"
+            ]
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, index=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False)
     sku_id = Column(Integer, ForeignKey("skus.id"), nullable=False, index=True)
     reorder_qty = Column(Integer, nullable=False)
     reason = Column(Text, nullable=False)  # Human-readable explanation
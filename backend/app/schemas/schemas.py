@@ -33,6 +33,28 @@ class UrgencyLevel(str, Enum):
 
 # ============== CSV Upload ==============
 
+# Accepted CSV date formats, tried in this order after the ISO fast path.
+# Always the same order: '%d/%m/%Y' and '%m/%d/%Y' both accept 01/02/2026,
+# and it must read day-first whatever was parsed before it
+SALES_DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%m/%d/%Y')
+
+
+def _parse_sales_date(v: str) -> date:
+    """Parse a CSV date string, ISO-8601 first, then SALES_DATE_FORMATS."""
+    if len(v) == 10 and v[4] == '-' and v[7] == '-':
+        try:
+            return date.fromisoformat(v)
+        except ValueError:
+            pass
+    
+    for fmt in SALES_DATE_FORMATS:
+        try:
+            return datetime.strptime(v, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Cannot parse date: {v}")
+
+
 class SalesRowSchema(BaseModel):
     """
     Single row from CSV upload.
@@ -54,13 +76,7 @@ class SalesRowSchema(BaseModel):
         if isinstance(v, date):
             return v
         if isinstance(v, str):
-            # Try common formats
-            for fmt in ['%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%m/%d/%Y']:
-                try:
-                    return datetime.strptime(v, fmt).date()
-                except ValueError:
-                    continue
-            raise ValueError(f"Cannot parse date: {v}")
+            return _parse_sales_date(v)
         return v
 
 
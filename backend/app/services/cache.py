@@ -0,0 +1,91 @@
+"""
+Redis-backed cache for hot dashboard reads.
+
+Best effort only: if Redis is unreachable every call degrades to a miss
+and the connection is retried after a short back-off, so the API keeps
+working (just uncached) without Redis.
+"""
+
+import logging
+import time
+from typing import Any, Optional
+
+import orjson
+import redis
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER_SECONDS = 30
+
+_client: Optional[redis.Redis] = None
+_retry_at = 0.0
+
+
+def _get_client() -> Optional[redis.Redis]:
+    """Lazily create the Redis client; None while disabled or backing off."""
+    global _client
+    if not settings.CACHE_ENABLED or time.monotonic() < _retry_at:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=0.25,
+            socket_timeout=0.25
+        )
+    return _client
+
+
+def _mark_unavailable(error: Exception) -> None:
+    global _retry_at
+    _retry_at = time.monotonic() + RETRY_AFTER_SECONDS
+    logger.warning(f"Cache unavailable, bypassing for {RETRY_AFTER_SECONDS}s: {error}")
+
+
+def cache_get(key: str) -> Optional[Any]:
+    """Return the cached JSON value for key, or None on a miss."""
+    client = _get_client()
+    if client is None:
+        return None
+    try:
+        raw = client.get(key)
+    except redis.RedisError as e:
+        _mark_unavailable(e)
+        return None
+    return orjson.loads(raw) if raw is not None else None
+
+
+def cache_set(key: str, value: Any, ttl: int) -> None:
+    """Store a JSON-serializable value under key for ttl seconds."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.set(key, orjson.dumps(value), ex=ttl)
+    except redis.RedisError as e:
+        _mark_unavailable(e)
+
+
+def cache_delete(*keys: str) -> None:
+    """Invalidate specific keys."""
+    client = _get_client()
+    if client is None or not keys:
+        return
+    try:
+        client.delete(*keys)
+    except redis.RedisError as e:
+        _mark_unavailable(e)
+
+
+def cache_delete_prefix(prefix: str) -> None:
+    """Invalidate every key starting with prefix."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        keys = list(client.scan_iter(match=f"{prefix}*", count=500))
+        if keys:
+            client.delete(*keys)
+    except redis.RedisError as e:
+        _mark_unavailable(e)
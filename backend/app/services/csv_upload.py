@@ -1,12 +1,31 @@
+import logging
+import sys
+import numpy as np
 import pandas as pd
-from io import StringIO
-from datetime import datetime
-from typing import List, Tuple, Optional, Dict
+from pandas.tseries.api import guess_datetime_format
+from io import BytesIO, StringIO
+from datetime import date, datetime
+from itertools import chain
+from typing import IO, Iterator, List, NamedTuple, Tuple, Optional, Dict, Union
+from sqlalchemy import insert, tuple_
 from sqlalchemy.orm import Session
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 from app.models import Store, SKU, SalesTransaction
 from app.schemas import SalesRowSchema, CSVUploadResponse
 
+# Raised mid-stream when a later CSV block doesn't fit the column types
+# pyarrow inferred from the first one
+ARROW_READ_ERRORS = (pa.ArrowInvalid,) if PYARROW_AVAILABLE else ()
+
+logger = logging.getLogger(__name__)
+
 
 # Column alias mapping for ingestion
 COLUMN_ALIASES: Dict[str, List[str]] = {
@@ -55,19 +74,178 @@ COLUMN_ALIASES: Dict[str, List[str]] = {
 }
 
 
+# Reverse lookup: normalized alias -> (standard column, priority in its alias list)
+_ALIAS_TO_TARGET: Dict[str, Tuple[str, int]] = {
+    alias: (target, rank)
+    for target, aliases in COLUMN_ALIASES.items()
+    for rank, alias in enumerate(aliases)
+}
+
+# pyarrow parses each block on its own thread; larger blocks mean fewer
+# chunks to stitch together when converting to pandas. Streaming uploads
+# are also processed one block at a time
+CSV_BLOCK_SIZE = 8 << 20
+
+# Rows per frame when pandas streams a file pyarrow gave up on mid-way
+CSV_CHUNK_ROWS = 100_000
+
+# Content inference looks at this many non-null values per column and
+# accepts a type when this share of them converts cleanly
+INFERENCE_SAMPLE_ROWS = 50
+INFERENCE_MIN_HIT_RATE = 0.8
+
+# (store, SKU) pairs per lookup query; two bind parameters each
+SKU_LOOKUP_BATCH = 500
+
+
+class _KeepNumericChars(dict):
+    """str.translate table that drops everything but digits and dots."""
+    
+    def __missing__(self, code: int) -> Optional[int]:
+        # Same set as the regex [^\d.] removed: any Unicode decimal digit
+        keep = code if code == 46 or chr(code).isdecimal() else None
+        self[code] = keep
+        return keep
+
+
+# "10 pcs" -> "10", "₹12.5" -> "12.5" in one C-level pass per value
+_NUMERIC_CHARS = _KeepNumericChars()
+
+def read_csv_frame(source: Union[str, IO[bytes]]) -> pd.DataFrame:
+    """
+    Parse CSV text or a binary stream into a DataFrame.
+    
+    Uses pyarrow's multi-threaded C++ reader when available. Files it
+    rejects (ragged rows, empty input) are re-read with pandas so parsing
+    stays as forgiving as before.
+    """
+    if isinstance(source, str):
+        source = BytesIO(source.encode('utf-8'))
+    
+    if PYARROW_AVAILABLE:
+        try:
+            table = pacsv.read_csv(
+                source,
+                read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+            )
+            return table.to_pandas()
+        except pa.ArrowInvalid:
+            source.seek(0)
+    
+    return pd.read_csv(source, encoding='utf-8')
+
+
+def iter_csv_frames(source: Union[str, IO[bytes]]) -> Iterator[pd.DataFrame]:
+    """
+    Yield the CSV as DataFrames of one pyarrow block each, so a big upload
+    is never materialized as a single table.
+    
+    Without pyarrow, or for files it rejects up front, the whole file is
+    read by read_csv_frame and yielded as one frame. pyarrow fixes column
+    types from the first block; if a later block disagrees ARROW_READ_ERRORS
+    is raised to the caller, which should re-read with iter_csv_chunks.
+    """
+    if isinstance(source, str):
+        source = BytesIO(source.encode('utf-8'))
+    
+    if PYARROW_AVAILABLE:
+        try:
+            reader = pacsv.open_csv(
+                source,
+                read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                convert_options=pacsv.ConvertOptions(strings_can_be_null=True)
+            )
+        except pa.ArrowInvalid:
+            source.seek(0)
+        else:
+            empty = True
+            for batch in reader:
+                empty = False
+                yield batch.to_pandas()
+            if empty:
+                # Header-only file: keep the columns
+                yield reader.schema.empty_table().to_pandas()
+            return
+    
+    yield read_csv_frame(source)
+
+
+def iter_csv_chunks(source: Union[str, IO[bytes]]) -> Iterator[pd.DataFrame]:
+    """
+    Yield the CSV as pandas frames of CSV_CHUNK_ROWS rows each.
+    
+    For files whose column types drift between pyarrow blocks: pandas
+    infers types per chunk, so a drifting column only becomes text in the
+    chunks where it drifts, and the file is still never read whole.
+    """
+    if isinstance(source, str):
+        source = BytesIO(source.encode('utf-8'))
+    
+    with pd.read_csv(source, encoding='utf-8', chunksize=CSV_CHUNK_ROWS) as reader:
+        yield from reader
+
+
+def guess_date_format(series: pd.Series) -> Optional[str]:
+    """strptime format of the first non-null value, if it is a string pandas can read."""
+    non_null = series.dropna()
+    if non_null.empty or not isinstance(non_null.iloc[0], str):
+        return None
+    return guess_datetime_format(non_null.iloc[0])
+
+
+def parse_date_column(series: pd.Series, fmt: Optional[str] = None) -> pd.Series:
+    """
+    Vectorised date parsing for the mapped 'date' column.
+    
+    Returns datetime.date values (NaT where unparseable). pyarrow already
+    yields date objects for ISO columns, which are passed through; string
+    columns are parsed in one cached pass with fmt, or the format guessed
+    from their first value (what pandas would infer anyway).
+    """
+    non_null = series.dropna()
+    if non_null.empty:
+        return pd.to_datetime(series, errors='coerce').dt.date
+    
+    first = non_null.iloc[0]
+    if isinstance(first, date) and not isinstance(first, datetime):
+        return series
+    
+    if fmt is None and isinstance(first, str):
+        fmt = guess_datetime_format(first)
+    return pd.to_datetime(series, format=fmt, errors='coerce', cache=True).dt.date
+
+
+def _normalize_column(name: str) -> str:
+    return name.lower().strip().replace(' ', '_').replace('-', '_')
+
+
+def match_columns(columns: List[str]) -> Dict[str, str]:
+    """
+    Match every known standard column in one pass over the headers.
+    Returns {standard name: original column}, preferring the
+    highest-priority alias when several headers match the same target.
+    """
+    best: Dict[str, Tuple[int, str]] = {}
+    for normalized, original in {_normalize_column(c): c for c in columns}.items():
+        hit = _ALIAS_TO_TARGET.get(normalized)
+        if hit:
+            target, rank = hit
+            if target not in best or rank < best[target][0]:
+                best[target] = (rank, original)
+    return {target: original for target, (_, original) in best.items()}
+
+
 def find_column_match(columns: List[str], target: str) -> Optional[str]:
     """
     Find a column that matches the target, checking aliases.
     Returns the original column name if found, None otherwise.
     """
-    aliases = COLUMN_ALIASES.get(target, [target])
-    columns_lower = {c.lower().strip().replace(' ', '_').replace('-', '_'): c for c in columns}
-    
-    for alias in aliases:
-        if alias in columns_lower:
-            return columns_lower[alias]
+    if target in COLUMN_ALIASES:
+        return match_columns(columns).get(target)
     
-    return None
+    columns_lower = {_normalize_column(c): c for c in columns}
+    return columns_lower.get(target)
 
 
 def map_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], List[str]]:
@@ -88,10 +266,10 @@ def map_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], List[st
     optional = ['price', 'discount', 'category']
     
     # 1. Header-Based Mapping
+    matches = match_columns(original_columns)
     for target in required + optional:
-        original_col = find_column_match(original_columns, target)
-        if original_col:
-            mapping[original_col] = target
+        if target in matches:
+            mapping[matches[target]] = target
             
     # Check what's missing
     found_targets = set(mapping.values())
@@ -104,38 +282,34 @@ def map_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], List[st
 
     # 2. Content-Based Inference (Fallback)
     # If we are missing critical columns, let's look at the data!
-    print(f"Header mapping failed for {missing}. Trying content inference...")
+    logger.info(f"Header mapping failed for {missing}. Trying content inference...")
     
     # helper to check if col is mostly dates
     def is_date_col(series):
+        sample = series.dropna().head(INFERENCE_SAMPLE_ROWS)
+        if len(sample) == 0: return False
         try:
-            # Check a sample
-            sample = series.dropna().head(20)
-            if len(sample) == 0: return False
-            pd.to_datetime(sample, dayfirst=True)
-            return True
-        except:
+            parsed = pd.to_datetime(sample, dayfirst=True, errors='coerce')
+        except (ValueError, TypeError):
             return False
+        return parsed.notna().mean() > INFERENCE_MIN_HIT_RATE
 
     # helper to check if col is numeric
     def is_numeric_col(series):
-        try:
-            # First try direct conversion
-            pd.to_numeric(series.dropna().head(20))
+        if pd.api.types.is_numeric_dtype(series):
             return True
-        except:
-            # Try cleaning "10 pcs" -> "10"
-            try:
-                sample = series.dropna().head(20).astype(str)
-                # Remove non-digits/dots
-                cleaned = sample.str.replace(r'[^\d.]', '', regex=True)
-                # If everything became empty, it was just text
-                if (cleaned == '').mean() > 0.5: return False
-                # Try converting cleaned
-                pd.to_numeric(cleaned)
+        sample = series.dropna().head(INFERENCE_SAMPLE_ROWS)
+        if len(sample) == 0: return False
+        try:
+            if pd.to_numeric(sample, errors='coerce').notna().mean() > INFERENCE_MIN_HIT_RATE:
                 return True
-            except:
-                return False
+            # Try cleaning "10 pcs" -> "10"
+            cleaned = sample.astype(str).str.translate(_NUMERIC_CHARS)
+            # If everything became empty, it was just text
+            if (cleaned == '').mean() > 0.5: return False
+            return pd.to_numeric(cleaned, errors='coerce').notna().mean() > INFERENCE_MIN_HIT_RATE
+        except (ValueError, TypeError):
+            return False
 
     remaining_cols = [c for c in original_columns if c not in mapping]
     
@@ -187,7 +361,7 @@ def map_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], List[st
             # Don't remove from string_cols yet, might fallback
         elif 'sku_name' in mapping.values():
             # Fallback: Use Name as ID
-            print("Mapping: Using Name as ID")
+            logger.info("Mapping: Using Name as ID")
             pass # ID will be generated from name later logic
 
     if 'store_id' in missing:
@@ -213,6 +387,144 @@ def map_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str], List[st
     return df, mapping, missing
 
 
+def normalize_sales_frame(df: pd.DataFrame, date_format: Optional[str] = None) -> pd.DataFrame:
+    """Standardize date and numeric formats of a mapped frame with vectorized pandas operations."""
+    if 'date' in df.columns:
+        df['date'] = parse_date_column(df['date'], date_format)
+        
+    for col in ['units_sold', 'price', 'discount']:
+        if col in df.columns:
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series):
+                # Already typed by the CSV reader: only blanks to fill
+                if series.hasnans:
+                    df[col] = series.fillna(0)
+                continue
+            # Remove non-numeric chars but keep dots/digits
+            if series.dtype == object:
+                series = series.astype(str).str.translate(_NUMERIC_CHARS)
+            df[col] = pd.to_numeric(series, errors='coerce').fillna(0)
+    
+    # Fill missing Store ID with default
+    if 'store_id' not in df.columns:
+        df['store_id'] = "STORE001"
+    else:
+        df['store_id'] = df['store_id'].fillna("STORE001").astype(str)
+    
+    # Rows and lookup keys share one object per distinct ID
+    for col in ['store_id', 'sku_id']:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = intern_strings(df[col])
+    return df
+
+
+def intern_strings(series: pd.Series) -> pd.Series:
+    """Replace repeated strings with one interned object per distinct value."""
+    codes, uniques = pd.factorize(series)
+    interned = np.array(
+        [sys.intern(v) if type(v) is str else v for v in uniques], dtype=object
+    )
+    values = series.to_numpy(dtype=object, copy=True)
+    known = codes >= 0
+    values[known] = interned[codes[known]]
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def _str_length_between(series: pd.Series, min_length: int, max_length: int) -> pd.Series:
+    """True where the value is a string whose length is within bounds."""
+    try:
+        return series.str.len().between(min_length, max_length)
+    except AttributeError:
+        # Column holds no strings at all (e.g. numeric IDs)
+        return pd.Series(False, index=series.index)
+
+
+def _number_between(series: pd.Series, low: float, high: Optional[float] = None, integral: bool = False) -> pd.Series:
+    """True where the value is a number within bounds (and whole, if integral)."""
+    if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return pd.Series(False, index=series.index)
+    ok = series.ge(low)
+    if high is not None:
+        ok &= series.le(high)
+    if integral and pd.api.types.is_float_dtype(series):
+        ok &= np.isfinite(series) & (series == np.floor(series))
+    return ok
+
+
+def screen_sales_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    Column-wise version of the SalesRowSchema constraints.
+    
+    Returns a boolean array that is True for rows which certainly pass
+    validation, so they can skip per-row Pydantic. Rows marked False are
+    not necessarily invalid; they go through SalesRowSchema one by one,
+    which stays the source of truth (and of the error messages).
+    """
+    ok = df['date'].notna()
+    ok &= _str_length_between(df['store_id'], 1, 50)
+    ok &= _str_length_between(df['sku_id'], 1, 50)
+    ok &= _str_length_between(df['sku_name'], 1, 300)
+    ok &= _number_between(df['units_sold'], 0, integral=True)
+    if 'price' in df.columns:
+        ok &= _number_between(df['price'], 0)
+    if 'discount' in df.columns:
+        ok &= _number_between(df['discount'], 0, 100)
+    if 'category' in df.columns:
+        category = df['category']
+        # Optional[str]: a string or None (NaN is rejected by Pydantic)
+        ok &= _str_length_between(category, 0, np.inf) | np.equal(category.to_numpy(dtype=object), None)
+    return ok.to_numpy(dtype=bool)
+
+
+# Columns of a validated sales row, in SalesRowSchema order
+SALES_FIELDS = [
+    'store_id', 'sku_id', 'sku_name', 'date', 'units_sold', 'price', 'discount', 'category'
+]
+
+
+class SalesColumns(NamedTuple):
+    """
+    Validated sales rows as parallel arrays, in file order.
+    
+    SKU names and categories are only needed for the first row of each
+    (store, SKU), so they are kept aside instead of per row.
+    """
+    store_id: np.ndarray  # object, interned strings
+    sku_id: np.ndarray  # object, interned strings
+    date: np.ndarray  # datetime64[D]
+    units_sold: np.ndarray  # int64
+    price: np.ndarray  # float64, NaN where absent
+    discount: np.ndarray  # float64, NaN where absent
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'SalesColumns':
+        """Pull the columns out of a frame of validated rows."""
+        def optional_float(col: str) -> np.ndarray:
+            if col not in df.columns:
+                return np.full(len(df), np.nan)
+            return df[col].astype(np.float64).to_numpy()
+        
+        return cls(
+            df['store_id'].to_numpy(dtype=object),
+            df['sku_id'].to_numpy(dtype=object),
+            df['date'].to_numpy(dtype=object).astype('datetime64[D]'),
+            df['units_sold'].to_numpy(dtype=np.int64),
+            optional_float('price'),
+            optional_float('discount')
+        )
+    
+    @classmethod
+    def concat(cls, blocks: List['SalesColumns']) -> 'SalesColumns':
+        return cls(*(np.concatenate(column) for column in zip(*blocks)))
+
+
+def _nan_to_none(values: np.ndarray) -> list:
+    """Float array as a list, with None where it holds NaN."""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
 class CSVUploadService:
     """Service for handling CSV uploads and data ingestion."""
     
@@ -222,167 +534,128 @@ class CSVUploadService:
     def __init__(self, db: Session):
         self.db = db
     
-    def process_csv(self, file_content: str) -> CSVUploadResponse:
+    def process_csv(self, file_content: Union[str, IO[bytes]]) -> CSVUploadResponse:
         """
         Process uploaded CSV file with SMART COLUMN MAPPING.
         
+        Accepts either the decoded CSV text or a binary file-like object
+        (e.g. UploadFile.file), which is parsed straight from the stream.
+        
         Automatically detects common column name variations like:
         - 'product_name' → 'sku_name'
         - 'qty' or 'quantity' → 'units_sold'
         - 'product_id' → 'sku_id'
         """
         try:
-            # Parse CSV
-            df = pd.read_csv(StringIO(file_content))
-            
-            # Automated Schema Normalization
-            df, column_mapping, missing_cols = map_columns(df)
-            
-            if missing_cols:
-                # Provide helpful error with suggestions
-                suggestions = []
-                for col in missing_cols:
-                    aliases = COLUMN_ALIASES.get(col, [])[:5]
-                    suggestions.append(f"'{col}' (we look for: {', '.join(aliases)})")
-                
-                return CSVUploadResponse(
-                    success=False,
-                    rows_processed=0,
-                    rows_failed=len(df),
-                    errors=[
-                        f"Could not find columns: {', '.join(missing_cols)}",
-                        f"We auto-detect common names. Missing: {'; '.join(suggestions)}"
-                    ]
-                )
-            
-            # Process rows
-            rows_processed = 0
-            rows_failed = 0
-            errors = []
-            store_id = None
-            
-            # 1. Vectorized Data Normalization
-            # Standardize date and numeric formats using vectorized pandas operations
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.date
-                
-            for col in ['units_sold', 'price', 'discount']:
-                if col in df.columns:
-                    # Remove non-numeric chars but keep dots/digits
-                    if df[col].dtype == object:
-                        df[col] = df[col].astype(str).str.replace(r'[^\d.]', '', regex=True)
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            
-            # Fill missing Store ID with default
-            if 'store_id' not in df.columns:
-                df['store_id'] = "STORE001"
-            else:
-                df['store_id'] = df['store_id'].fillna("STORE001").astype(str)
-
-            # 2. Conversion to List of Dicts (Bypass row iteration)
-            records = df.to_dict('records')
-            valid_rows: List[SalesRowSchema] = []
+            try:
+                parsed = self._parse_rows(iter_csv_frames(file_content))
+            except ARROW_READ_ERRORS:
+                # Column types drifted between blocks: start over with
+                # pandas, which types each chunk on its own
+                if not isinstance(file_content, str):
+                    file_content.seek(0)
+                parsed = self._parse_rows(iter_csv_chunks(file_content))
             
-            for idx, row_data in enumerate(records):
-                try:
-                    # Filter out rows with invalid dates early
-                    if pd.isna(row_data.get('date')):
-                         raise ValueError(f"Invalid or missing date format in row {idx + 2}")
-
-                    # Bulk validated by Pydantic
-                    validated = SalesRowSchema(**row_data)
-                    valid_rows.append(validated)
-                    rows_processed += 1
-                    if store_id is None:
-                        store_id = validated.store_id
-                except Exception as e:
-                    rows_failed += 1
-                    if len(errors) < 10:
-                        err_msg = f"Row {idx + 2}: {str(e)}"
-                        errors.append(err_msg)
-                        print(f"Validation error: {err_msg}")
+            if isinstance(parsed, CSVUploadResponse):
+                return parsed
+            columns, sku_details, rows_processed, rows_failed, errors, store_id = parsed
 
-            if not valid_rows:
+            if not len(columns.store_id):
                 return CSVUploadResponse(success=False, rows_processed=0, rows_failed=rows_failed, errors=errors)
 
             # 3. Optimized Store Management
-            unique_store_ids = set(r.store_id for r in valid_rows)
-            store_map = {}
-            for sid in unique_store_ids:
-                store = self.db.query(Store).filter(Store.store_id == sid).first()
-                if not store:
-                    store = Store(store_id=sid, name=f"Store {sid}")
-                    self.db.add(store)
-                    self.db.flush()
+            unique_store_ids = set(sid for sid, _ in sku_details)
+            store_map = {
+                s.store_id: s for s in
+                self.db.query(Store).filter(Store.store_id.in_(unique_store_ids)).all()
+            }
+            new_stores = [sid for sid in unique_store_ids if sid not in store_map]
+            for sid in new_stores:
+                store = Store(store_id=sid, name=f"Store {sid}")
+                self.db.add(store)
                 store_map[sid] = store
+            if new_stores:
+                self.db.flush()
 
             # 4. SKU Management (Bulk)
-            # Predetermine all SKUs needed to minimize queries
-            unique_skus_keys = set((store_map[r.store_id].id, r.sku_id) for r in valid_rows)
-            existing_skus = self.db.query(SKU).filter(
-                SKU.store_id.in_([s.id for s in store_map.values()])
-            ).all()
-            sku_map = {(s.store_id, s.sku_id): s for s in existing_skus}
+            # Fetch only the SKUs this upload touches, not whole stores
+            wanted_skus = [(store_map[sid].id, sku_id_str) for sid, sku_id_str in sku_details]
+            sku_map = self._find_skus(wanted_skus)
             
             new_skus = []
-            for s_db_id, sku_id_str in unique_skus_keys:
+            for (sid, sku_id_str), (sku_name, category) in sku_details.items():
+                s_db_id = store_map[sid].id
                 if (s_db_id, sku_id_str) not in sku_map:
-                    # Find first matching row for name/category
-                    row = next(r for r in valid_rows if r.sku_id == sku_id_str and store_map[r.store_id].id == s_db_id)
-                    new_skus.append(SKU(
-                        sku_id=sku_id_str,
-                        sku_name=row.sku_name,
-                        store_id=s_db_id,
-                        category=row.category
-                    ))
+                    new_skus.append({
+                        'sku_id': sku_id_str,
+                        'sku_name': sku_name,
+                        'store_id': s_db_id,
+                        'category': category
+                    })
 
             if new_skus:
-                self.db.bulk_save_objects(new_skus)
-                self.db.flush()
-                # Refresh map
-                updated_skus = self.db.query(SKU).filter(SKU.store_id.in_([s.id for s in store_map.values()])).all()
-                sku_map = {(s.store_id, s.sku_id): s for s in updated_skus}
+                # One batched INSERT .. RETURNING hands back the new keys,
+                # so the map needs no second SELECT
+                sku_table = SKU.__table__
+                created = self.db.execute(
+                    insert(sku_table).returning(sku_table.c.id, sku_table.c.store_id, sku_table.c.sku_id),
+                    new_skus
+                )
+                sku_map.update(((r.store_id, r.sku_id), r.id) for r in created)
 
             # 5. Fast Transaction Injection
-            bulk_transactions = []
-            seen_keys = set()
+            # Integer-encode each row's (store, SKU, date) so deduplication
+            # and the per-store delete ranges are array operations
+            # (one lookup per distinct store / SKU, not per row)
+            store_pks = {sid: store.id for sid, store in store_map.items()}
+            store_codes, store_uniques = pd.factorize(columns.store_id)
+            row_store = np.array([store_pks[sid] for sid in store_uniques], dtype=np.int64)[store_codes]
+            pair_codes, pair_uniques = pd.factorize(
+                pd.MultiIndex.from_arrays([columns.store_id, columns.sku_id])
+            )
+            row_sku = np.array(
+                [sku_map[(store_pks[sid], sku_id_str)] for sid, sku_id_str in pair_uniques],
+                dtype=np.int64
+            )[pair_codes]
+            row_day = columns.date.astype(np.int64)
             
-            for row in valid_rows:
-                s_obj = store_map[row.store_id]
-                sku_obj = sku_map[(s_obj.id, row.sku_id)]
-                key = (s_obj.id, sku_obj.id, row.date)
-                
-                if key in seen_keys: continue
-                seen_keys.add(key)
-                
-                bulk_transactions.append(SalesTransaction(
-                    store_id=s_obj.id,
-                    sku_id=sku_obj.id,
-                    date=row.date,
-                    units_sold=row.units_sold,
-                    price=row.price,
-                    discount=row.discount
-                ))
+            # First occurrence of every key, kept in file order
+            _, first = np.unique(np.column_stack((row_store, row_sku, row_day)), axis=0, return_index=True)
+            first.sort()
+            
+            # Plain dicts, never SalesTransaction instances
+            bulk_transactions = [
+                {
+                    'store_id': store_pk,
+                    'sku_id': sku_pk,
+                    'date': row_date,
+                    'units_sold': units_sold,
+                    'price': price,
+                    'discount': discount
+                }
+                for store_pk, sku_pk, row_date, units_sold, price, discount in zip(
+                    row_store[first].tolist(), row_sku[first].tolist(),
+                    columns.date[first].tolist(), columns.units_sold[first].tolist(),
+                    _nan_to_none(columns.price[first]), _nan_to_none(columns.discount[first])
+                )
+            ]
 
             if bulk_transactions:
-                 # Group by store for cleanup and insertion
-                 for sid_obj, store_obj in store_map.items():
-                     store_rows = [r for r in valid_rows if r.store_id == sid_obj]
-                     if not store_rows: continue
-                     
-                     min_date = min(r.date for r in store_rows)
-                     max_date = max(r.date for r in store_rows)
-                     relevant_sku_ids = [sku_map[(store_obj.id, r.sku_id)].id for r in store_rows]
-                     
+                 # Clean up per store before insertion
+                 for store_pk in np.unique(row_store).tolist():
+                     in_store = row_store == store_pk
+                     store_days = columns.date[in_store]
                      # Delete existing overlap to avoid unique constraint violations or duplicates
                      self.db.query(SalesTransaction).filter(
-                         SalesTransaction.store_id == store_obj.id,
-                         SalesTransaction.date >= min_date,
-                         SalesTransaction.date <= max_date,
-                         SalesTransaction.sku_id.in_(relevant_sku_ids)
+                         SalesTransaction.store_id == store_pk,
+                         SalesTransaction.date >= store_days.min().item(),
+                         SalesTransaction.date <= store_days.max().item(),
+                         SalesTransaction.sku_id.in_(np.unique(row_sku[in_store]).tolist())
                      ).delete(synchronize_session=False)
 
-                 self.db.bulk_save_objects(bulk_transactions)
+                 # Core executemany straight against the table: no ORM bulk
+                 # layer, batched into multi-row INSERTs by the dialect
+                 self.db.execute(insert(SalesTransaction.__table__), bulk_transactions)
             
             self.db.commit()
             
@@ -410,161 +683,145 @@ class CSVUploadService:
                 errors=[f"Failed to parse CSV: {str(e)}"]
             )
     
-    def _row_to_dict(self, row: pd.Series) -> dict:
-        """Convert pandas row to dict for validation."""
-        data = {}
-        for col in self.REQUIRED_COLUMNS + self.OPTIONAL_COLUMNS:
-            if col in row.index:
-                val = row[col]
-                
-                # CLEANING BEFORE VALIDATION
-                if col == 'date':
-                     val = self._parse_date(val)
-                elif col in ['units_sold', 'price', 'discount']:
-                     val = self._clean_number(val)
-                
-                # Handle NaN values
-                if pd.isna(val) or val == '':
-                    data[col] = None
-                else:
-                    data[col] = val
-        
-        # Default Store ID if missing (Critical for "accept anything")
-        if 'store_id' not in data or data['store_id'] is None:
-             data['store_id'] = "STORE001"  # Default for single-store setups
-
-        return data
+    def _find_skus(self, keys: List[Tuple[int, str]]) -> Dict[Tuple[int, str], int]:
+        """
+        Map (store pk, sku_id) to SKU primary keys with row-value IN
+        queries, batched to stay under the database's bind parameter limit.
+        """
+        found: Dict[Tuple[int, str], int] = {}
+        for start in range(0, len(keys), SKU_LOOKUP_BATCH):
+            batch = keys[start:start + SKU_LOOKUP_BATCH]
+            rows = self.db.query(SKU.id, SKU.store_id, SKU.sku_id).filter(
+                tuple_(SKU.store_id, SKU.sku_id).in_(batch)
+            ).all()
+            found.update(((r.store_id, r.sku_id), r.id) for r in rows)
+        return found
     
-    def _parse_date(self, date_str):
-        """Try to parse date from various formats."""
-        if isinstance(date_str, (datetime, pd.Timestamp)):
-            return date_str.date()
-            
-        formats = [
-            '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%m/%d/%Y',
-            '%Y/%m/%d', '%d-%b-%Y', '%d-%b-%y'
-        ]
+    def _parse_rows(
+        self,
+        frames: Iterator[pd.DataFrame]
+    ) -> Union[
+        CSVUploadResponse,
+        Tuple[SalesColumns, Dict[Tuple[str, str], Tuple[str, Optional[str]]], int, int, List[str], Optional[str]]
+    ]:
+        """
+        Map, normalize and validate the CSV one frame at a time.
         
-        for fmt in formats:
-            try:
-                return datetime.strptime(str(date_str).split()[0], fmt).date()
-            except ValueError:
-                continue
+        Column mapping (and the date format) is worked out on the first
+        frame and replayed on the rest, so only the validated columns are
+        kept across frames. Returns (columns, sku_details, rows_processed,
+        rows_failed, errors, store_id), where sku_details maps each
+        (store, SKU) to the name and category of its first row, or an
+        error response if required columns are missing.
+        """
+        frames = iter(frames)
         
-        # Last resort: pandas to_datetime which is very powerful
-        try:
-            return pd.to_datetime(date_str).date()
-        except:
-            raise ValueError(f"Could not parse date: {date_str}")
-
-    def _clean_number(self, val):
-        """Clean operations for numbers (e.g. '10 pcs' -> 10)."""
-        if val is None:
-            return None
-        if isinstance(val, (int, float)):
-            return val
+        # Automated Schema Normalization
+        df, column_mapping, missing_cols = map_columns(next(frames))
         
-        # Remove currency symbols and text
-        s = str(val).lower()
-        cleaned = ''.join(c for c in s if c.isdigit() or c == '.')
-        try:
-            return float(cleaned) if '.' in cleaned else int(cleaned)
-        except:
-            return 0
-
-    def _process_row(self, row: SalesRowSchema) -> None:
-        """
-        Process a single validated row.
-        Creates store/SKU if needed, inserts sales transaction.
-        """
-        # Parse date and clean numbers robustly
-        try:
-            row_date = self._parse_date(row.date)
-            row_units = self._clean_number(row.units_sold)
-            row_price = self._clean_number(row.price)
-            row_discount = self._clean_number(row.discount)
-        except Exception as e:
-            raise ValueError(f"Data cleaning error: {str(e)}")
-
-        # Get or create store
-        store = self._get_or_create_store(row.store_id)
+        if missing_cols:
+            # Provide helpful error with suggestions
+            suggestions = []
+            for col in missing_cols:
+                aliases = COLUMN_ALIASES.get(col, [])[:5]
+                suggestions.append(f"'{col}' (we look for: {', '.join(aliases)})")
+            
+            return CSVUploadResponse(
+                success=False,
+                rows_processed=0,
+                rows_failed=len(df) + sum(len(frame) for frame in frames),
+                errors=[
+                    f"Could not find columns: {', '.join(missing_cols)}",
+                    f"We auto-detect common names. Missing: {'; '.join(suggestions)}"
+                ]
+            )
         
-        # Get or create SKU
-        sku = self._get_or_create_sku(
-            sku_id=str(row.sku_id),
-            sku_name=str(row.sku_name),
-            store_id=store.id,
-            category=row.category
-        )
+        # map_columns falls back to the name as SKU id when no id column exists
+        copy_sku_id = 'sku_id' not in column_mapping.values()
         
-        # Check for duplicate transaction
-        existing = self.db.query(SalesTransaction).filter(
-            SalesTransaction.store_id == store.id,
-            SalesTransaction.sku_id == sku.id,
-            SalesTransaction.date == row_date
-        ).first()
+        def remap(frame: pd.DataFrame) -> pd.DataFrame:
+            frame = frame.rename(columns=column_mapping)
+            if copy_sku_id:
+                frame['sku_id'] = frame['sku_name']
+            return frame
         
-        if existing:
-            # Update existing transaction
-            existing.units_sold = row_units
-            if row_price is not None:
-                existing.price = row_price
-            if row_discount is not None:
-                existing.discount = row_discount
-        else:
-            # Create new transaction
-            transaction = SalesTransaction(
-                store_id=store.id,
-                sku_id=sku.id,
-                date=row_date,
-                units_sold=row_units,
-                price=row_price,
-                discount=row_discount
-            )
-            self.db.add(transaction)
-    
-    def _get_or_create_store(self, store_id: str) -> Store:
-        """Get existing store or create new one."""
-        store = self.db.query(Store).filter(Store.store_id == store_id).first()
-        if not store:
-            store = Store(
-                store_id=store_id,
-                name=f"Store {store_id}"  # Default name
-            )
-            self.db.add(store)
-            self.db.flush()  # Get the ID
-        return store
-    
-    def _get_or_create_sku(
-        self, 
-        sku_id: str, 
-        sku_name: str, 
-        store_id: int,
-        category: Optional[str] = None
-    ) -> SKU:
-        """Get existing SKU or create new one."""
-        sku = self.db.query(SKU).filter(
-            SKU.sku_id == sku_id,
-            SKU.store_id == store_id
-        ).first()
+        date_format = guess_date_format(df['date'])
         
-        if not sku:
-            sku = SKU(
-                sku_id=sku_id,
-                sku_name=sku_name,
-                store_id=store_id,
-                category=category
-            )
-            self.db.add(sku)
-            self.db.flush()
-        else:
-            # Update name if changed
-            if sku.sku_name != sku_name:
-                sku.sku_name = sku_name
-            if category and sku.category != category:
-                sku.category = category
+        rows_processed = 0
+        rows_failed = 0
+        errors = []
+        store_id = None
+        blocks: List[SalesColumns] = []
+        sku_details: Dict[Tuple[str, str], Tuple[str, Optional[str]]] = {}
+        offset = 0
+        
+        for df in chain([df], (remap(frame) for frame in frames)):
+            # 1. Vectorized Data Normalization
+            df = normalize_sales_frame(df, date_format)
+            
+            # 2. Column-wise validation; only rows the screen rejects
+            # pay for per-row Pydantic validation
+            passes = screen_sales_rows(df)
+            rows_processed += int(passes.sum())
+            
+            # Later copies of a screened (store, SKU, date) still count as
+            # processed, but the first one wins, so don't keep the rest
+            keep = passes.copy()
+            keep[passes] = ~df.loc[passes, ['store_id', 'sku_id', 'date']].duplicated(keep='first').to_numpy()
+            
+            # Plain tuples in SALES_FIELDS order instead of a dict per row;
+            # absent optional columns read as None
+            rejected = df.loc[~passes].reindex(columns=SALES_FIELDS)
+            for col in SALES_FIELDS:
+                if col not in df.columns:
+                    rejected[col] = None
+            
+            rescued = []
+            rescued_index = []
+            for pos, values in zip(np.flatnonzero(~passes).tolist(), rejected.itertuples(index=False, name=None)):
+                row_data = dict(zip(SALES_FIELDS, values))
+                line = offset + pos + 2
+                try:
+                    # Filter out rows with invalid dates early
+                    if pd.isna(row_data.get('date')):
+                         raise ValueError(f"Invalid or missing date format in row {line}")
+
+                    # Only rows the screen rejected get here: full Pydantic
+                    # validation decides, and explains what is wrong
+                    rescued.append(SalesRowSchema.model_validate(row_data).model_dump())
+                    rescued_index.append(df.index[pos])
+                    rows_processed += 1
+                except Exception as e:
+                    rows_failed += 1
+                    if len(errors) < 10:
+                        err_msg = f"Row {line}: {str(e)}"
+                        errors.append(err_msg)
+                        logger.warning(f"Validation error: {err_msg}")
+            
+            valid = df.loc[keep, [col for col in SALES_FIELDS if col in df.columns]]
+            if rescued:
+                # Back into file order, so the first copy of a key still wins
+                valid = pd.concat(
+                    [valid, pd.DataFrame(rescued, index=rescued_index, columns=SALES_FIELDS)]
+                ).sort_index()
+            
+            blocks.append(SalesColumns.from_frame(valid))
+            
+            # Name and category of each (store, SKU)'s first row, for new SKUs
+            firsts = valid.drop_duplicates(['store_id', 'sku_id'])
+            categories = firsts['category'].tolist() if 'category' in firsts.columns else [None] * len(firsts)
+            for key, sku_name, category in zip(
+                zip(firsts['store_id'].tolist(), firsts['sku_id'].tolist()),
+                firsts['sku_name'].tolist(), categories
+            ):
+                sku_details.setdefault(key, (sku_name, category if isinstance(category, str) else None))
+            
+            if store_id is None and len(valid):
+                store_id = valid['store_id'].iat[0]
+            
+            offset += len(df)
         
-        return sku
+        return SalesColumns.concat(blocks), sku_details, rows_processed, rows_failed, errors, store_id
 
 
 def validate_csv_columns(file_content: str) -> Tuple[bool, List[str], List[str]]:
@@ -5,11 +5,14 @@ India-specific festival configuration for demand forecasting.
 Do NOT hardcode festivals - use the database config table.
 """
 
+import numpy as np
 from datetime import date, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import bindparam, insert, or_, select, tuple_
 from sqlalchemy.orm import Session
 
 from app.models import Festival
+from app.services.cache import cache_delete_prefix
 
 
 # Default India festivals - can be customized per store/region
@@ -48,42 +51,82 @@ DEFAULT_FESTIVALS = [
 ]
 
 
+# Day offsets around a festival date that count as its festival period
+FESTIVAL_WINDOW = np.arange(-2, 3)
+FESTIVAL_REACH = int(np.abs(FESTIVAL_WINDOW).max())
+
+
+def _range_statement(*entities, by_region: bool = False):
+    """Festivals dated start_date..end_date, optionally for a region, by date."""
+    statement = select(*entities).where(
+        Festival.date.between(bindparam("start_date"), bindparam("end_date"))
+    )
+    if by_region:
+        statement = statement.where(
+            or_(Festival.region == bindparam("region"), Festival.region == "All India")
+        )
+    return statement.order_by(Festival.date)
+
+
 class FestivalService:
     """Service for managing festival configurations."""
     
+    # Range lookups run on every forecast batch and dashboard refresh; build
+    # each statement once (with and without the region filter) and bind the
+    # dates per call
+    _RANGE_STMTS = {
+        by_region: _range_statement(Festival, by_region=by_region)
+        for by_region in (False, True)
+    }
+    _RANGE_ROW_STMTS = {
+        by_region: _range_statement(
+            Festival.date, Festival.name, Festival.impact_multiplier, by_region=by_region
+        )
+        for by_region in (False, True)
+    }
+    
     def __init__(self, db: Session):
         self.db = db
+        # date -> impact multiplier for the days in _impact_range; built on
+        # first use, rebuilt for dates outside it, dropped whenever
+        # festivals change
+        self._impact_cache: Optional[Dict[date, float]] = None
+        self._impact_range: Optional[Tuple[date, date]] = None
     
     def seed_default_festivals(self, year: int = 2026) -> int:
         """
         Seed the database with default festival dates for a given year.
         Returns number of festivals added.
         """
-        count = 0
+        rows = []
         for fest in DEFAULT_FESTIVALS:
             try:
                 festival_date = date(year, fest["month"], fest["day"])
-                
-                # Check if already exists
-                existing = self.db.query(Festival).filter(
-                    Festival.name == fest["name"],
-                    Festival.date == festival_date
-                ).first()
-                
-                if not existing:
-                    festival = Festival(
-                        name=fest["name"],
-                        date=festival_date,
-                        region=fest["region"],
-                        impact_multiplier=fest["impact_multiplier"]
-                    )
-                    self.db.add(festival)
-                    count += 1
             except ValueError:
                 # Invalid date, skip
                 continue
+            rows.append({
+                "name": fest["name"],
+                "date": festival_date,
+                "region": fest["region"],
+                "impact_multiplier": fest["impact_multiplier"],
+            })
+        
+        # One lookup for the ones already seeded, one insert for the rest
+        existing = set(
+            self.db.query(Festival.name, Festival.date).filter(
+                tuple_(Festival.name, Festival.date).in_([(r["name"], r["date"]) for r in rows])
+            ).all()
+        ) if rows else set()
+        missing = [r for r in rows if (r["name"], r["date"]) not in existing]
+        if missing:
+            self.db.execute(insert(Festival.__table__), missing)
+        count = len(missing)
         
         self.db.commit()
+        if count:
+            self._impact_cache = None
+            cache_delete_prefix("festival-impact:")
         return count
     
     def get_festivals_in_range(
@@ -93,17 +136,27 @@ class FestivalService:
         region: Optional[str] = None
     ) -> List[Festival]:
         """Get all festivals within a date range."""
-        query = self.db.query(Festival).filter(
-            Festival.date >= start_date,
-            Festival.date <= end_date
-        )
+        params = {"start_date": start_date, "end_date": end_date}
+        if region:
+            params["region"] = region
         
+        return self.db.execute(self._RANGE_STMTS[bool(region)], params).scalars().all()
+    
+    def get_festivals_in_range_light(
+        self,
+        start_date: date,
+        end_date: date,
+        region: Optional[str] = None
+    ) -> List[Tuple[date, str, float]]:
+        """
+        Same festivals as get_festivals_in_range, as plain
+        (date, name, impact_multiplier) rows for read-only callers.
+        """
+        params = {"start_date": start_date, "end_date": end_date}
         if region:
-            query = query.filter(
-                (Festival.region == region) | (Festival.region == "All India")
-            )
+            params["region"] = region
         
-        return query.order_by(Festival.date).all()
+        return [tuple(row) for row in self.db.execute(self._RANGE_ROW_STMTS[bool(region)], params).all()]
     
     def get_festival_dates_dict(
         self, 
@@ -114,37 +167,61 @@ class FestivalService:
         Get a dict mapping dates to festival names.
         Used for feature engineering.
         """
-        festivals = self.get_festivals_in_range(start_date, end_date)
+        festivals = self.get_festivals_in_range_light(start_date, end_date)
+        if not festivals:
+            return {}
+        
+        # Include days around the festival (festival effect): one row of
+        # 2 days before to 2 days after per festival, as day ordinals
+        fest_days = np.array([fest_date.toordinal() for fest_date, _, _ in festivals])
+        days = (fest_days[:, None] + FESTIVAL_WINDOW[None, :]).ravel()
+        names = np.repeat(np.array([name for _, name, _ in festivals], dtype=object), len(FESTIVAL_WINDOW))
         
-        result = {}
-        for fest in festivals:
-            # Include days around the festival (festival effect)
-            for delta in range(-2, 3):  # 2 days before to 2 days after
-                fest_date = fest.date + timedelta(days=delta)
-                if start_date <= fest_date <= end_date:
-                    if fest_date not in result:
-                        result[fest_date] = fest.name
+        in_range = (days >= start_date.toordinal()) & (days <= end_date.toordinal())
+        days, names = days[in_range], names[in_range]
         
-        return result
+        # Earlier festivals keep the days they share with later ones
+        _, first = np.unique(days, return_index=True)
+        first.sort()
+        return {
+            date.fromordinal(day): name
+            for day, name in zip(days[first].tolist(), names[first].tolist())
+        }
     
     def get_impact_multiplier(self, target_date: date) -> float:
         """
         Get demand impact multiplier for a specific date.
-        Returns 1.0 if no festival, higher if festival nearby.
+        Returns 1.0 if no festival, higher if festival nearby; with several
+        festivals in reach, the strongest faded multiplier wins.
         """
-        # Check 2 days before and after
-        for delta in range(-2, 3):
-            check_date = target_date + timedelta(days=-delta)
-            festival = self.db.query(Festival).filter(
-                Festival.date == check_date
-            ).first()
-            
-            if festival:
-                # Reduce impact for days before/after
-                distance_factor = 1.0 - (abs(delta) * 0.2)
-                return festival.impact_multiplier * distance_factor
-        
-        return 1.0
+        return self._get_impact_cache(target_date, target_date).get(target_date, 1.0)
+    
+    def _get_impact_cache(self, start_date: date, end_date: date) -> Dict[date, float]:
+        covered = self._impact_range
+        if (
+            self._impact_cache is None or covered is None
+            or start_date < covered[0] or end_date > covered[1]
+        ):
+            self._impact_cache = self._build_impact_cache(start_date, end_date)
+            self._impact_range = (start_date, end_date)
+        return self._impact_cache
+    
+    def _build_impact_cache(self, start_date: date, end_date: date) -> Dict[date, float]:
+        """
+        Load the festivals within FESTIVAL_REACH days of start_date..end_date
+        and spread each multiplier over the FESTIVAL_WINDOW days around it
+        (target = festival + delta), fading 20% per day away. Overlapping
+        windows (Dhanteras and Diwali) keep the stronger effect.
+        """
+        first = date.fromordinal(max(start_date.toordinal() - FESTIVAL_REACH, 1))
+        last = date.fromordinal(min(end_date.toordinal() + FESTIVAL_REACH, date.max.toordinal()))
+        impact_cache: Dict[date, float] = {}
+        for fest_date, _, multiplier in self.get_festivals_in_range_light(first, last):
+            for delta in FESTIVAL_WINDOW.tolist():
+                affected = fest_date + timedelta(days=delta)
+                impact = multiplier * (1.0 - abs(delta) * 0.2)
+                impact_cache[affected] = max(impact_cache.get(affected, 1.0), impact)
+        return impact_cache
     
     def add_festival(
         self,
@@ -162,6 +239,8 @@ class FestivalService:
         )
         self.db.add(festival)
         self.db.commit()
+        self._impact_cache = None
+        cache_delete_prefix("festival-impact:")
         return festival
     
     def get_all_festivals(self) -> List[Festival]:
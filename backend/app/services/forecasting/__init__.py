@@ -1,11 +1,15 @@
 # Forecasting module
-from app.services.forecasting.baseline import BaselineForecaster, ForecastPoint, calculate_velocity_change
+from app.services.forecasting.baseline import (
+    BaselineForecaster, ForecastPoint, FORECAST_DTYPE, calculate_velocity_change, to_forecast_points
+)
 from app.services.forecasting.arima import ARIMAForecaster, FeatureEngineering
 from app.services.forecasting.forecaster import ForecasterService
 
 __all__ = [
     "BaselineForecaster",
     "ForecastPoint",
+    "FORECAST_DTYPE",
+    "to_forecast_points",
     "calculate_velocity_change",
     "ARIMAForecaster",
     "FeatureEngineering",
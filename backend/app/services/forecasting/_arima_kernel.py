@@ -0,0 +1,257 @@
+"""
+JIT-compiled ARIMA(2, d, 2) fast path.
+
+Fits the ARMA(2, 2) part with the Hannan-Rissanen two-step regression
+(long autoregression for residual estimates, then least squares on lagged
+values and residuals), polished by a Nelder-Mead search on the conditional
+sum of squares, instead of statsmodels' Kalman-filter MLE, and forecasts
+with the plain recursion. Only used when settings.ARIMA_BACKEND is
+"numba"; callers fall back to statsmodels when ok is False (too little
+data, non-stationary / non-invertible fit or non-finite values).
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in so the kernels still import (and run, slowly) without numba."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+# Two-sided 95% normal quantile, as used by statsmodels' conf_int(alpha=0.05)
+Z_95 = 1.959963984540054
+
+# Nelder-Mead polish of the Hannan-Rissanen estimates
+NM_MAX_ITER = 400
+NM_TOL = 1e-10
+
+
+@njit(cache=True)
+def _levinson_ar(w, order):
+    """Yule-Walker AR coefficients for a demeaned series via Levinson-Durbin."""
+    n = w.shape[0]
+    acov = np.empty(order + 1)
+    for lag in range(order + 1):
+        total = 0.0
+        for t in range(lag, n):
+            total += w[t] * w[t - lag]
+        acov[lag] = total / n
+
+    phi = np.zeros(order)
+    if acov[0] <= 0.0:
+        return phi
+    prev = np.zeros(order)
+    err = acov[0]
+    for k in range(order):
+        acc = acov[k + 1]
+        for j in range(k):
+            acc -= prev[j] * acov[k - j]
+        reflection = acc / err
+        phi[k] = reflection
+        for j in range(k):
+            phi[j] = prev[j] - reflection * prev[k - 1 - j]
+        err *= 1.0 - reflection * reflection
+        if err <= 0.0:
+            break
+        prev[:k + 1] = phi[:k + 1]
+    return phi
+
+
+@njit(cache=True)
+def _admissible(params):
+    """Stationary AR and invertible MA (the AR(2)/MA(2) triangle conditions)."""
+    phi1, phi2, theta1, theta2 = params[0], params[1], params[2], params[3]
+    if not (abs(phi2) < 1.0 and phi1 + phi2 < 1.0 and phi2 - phi1 < 1.0):
+        return False
+    return abs(theta2) < 1.0 and theta1 + theta2 > -1.0 and theta2 - theta1 > -1.0
+
+
+@njit(cache=True)
+def _css(params, w):
+    """Conditional sum of squared innovations; inf outside the admissible region."""
+    if not _admissible(params):
+        return np.inf
+    phi1, phi2, theta1, theta2 = params[0], params[1], params[2], params[3]
+    e_prev1, e_prev2 = 0.0, 0.0
+    total = 0.0
+    for t in range(2, w.shape[0]):
+        e = w[t] - phi1 * w[t - 1] - phi2 * w[t - 2] - theta1 * e_prev1 - theta2 * e_prev2
+        total += e * e
+        e_prev2, e_prev1 = e_prev1, e
+    return total
+
+
+@njit(cache=True)
+def _nelder_mead(x0, w):
+    """Minimize _css from x0 with the standard Nelder-Mead simplex moves."""
+    dim = x0.shape[0]
+    simplex = np.empty((dim + 1, dim))
+    losses = np.empty(dim + 1)
+    simplex[0] = x0
+    for i in range(dim):
+        simplex[i + 1] = x0
+        simplex[i + 1, i] += 0.05 * abs(x0[i]) + 0.05
+    for i in range(dim + 1):
+        losses[i] = _css(simplex[i], w)
+
+    for _ in range(NM_MAX_ITER):
+        order = np.argsort(losses)
+        simplex, losses = simplex[order], losses[order]
+        if losses[-1] - losses[0] <= NM_TOL * (abs(losses[0]) + NM_TOL):
+            break
+
+        centroid = simplex[:-1].sum(axis=0) / dim
+        reflected = centroid + (centroid - simplex[-1])
+        loss_r = _css(reflected, w)
+        if loss_r < losses[0]:
+            expanded = centroid + 2.0 * (centroid - simplex[-1])
+            loss_e = _css(expanded, w)
+            if loss_e < loss_r:
+                simplex[-1], losses[-1] = expanded, loss_e
+            else:
+                simplex[-1], losses[-1] = reflected, loss_r
+        elif loss_r < losses[-2]:
+            simplex[-1], losses[-1] = reflected, loss_r
+        else:
+            contracted = centroid + 0.5 * (simplex[-1] - centroid)
+            loss_c = _css(contracted, w)
+            if loss_c < losses[-1]:
+                simplex[-1], losses[-1] = contracted, loss_c
+            else:
+                # Shrink everything toward the best vertex
+                for i in range(1, dim + 1):
+                    simplex[i] = simplex[0] + 0.5 * (simplex[i] - simplex[0])
+                    losses[i] = _css(simplex[i], w)
+
+    best = np.argmin(losses)
+    return simplex[best].copy(), losses[best]
+
+
+@njit(cache=True)
+def ar2ma2_forecast(y, d, horizon):
+    """
+    Forecast y with an ARIMA(2, d, 2) model.
+
+    Returns (mean, lower, upper, ok) where lower/upper bound the 95%
+    prediction interval.
+    """
+    mean = np.zeros(horizon)
+    lower = np.zeros(horizon)
+    upper = np.zeros(horizon)
+    if not np.isfinite(y).all():
+        return mean, lower, upper, False
+
+    # Difference d times, remembering each level's last value to undo it
+    w = y.copy()
+    last_values = np.empty(d)
+    for k in range(d):
+        last_values[k] = w[-1]
+        w = w[1:] - w[:-1]
+    n = w.shape[0]
+
+    # Like statsmodels, only an undifferenced model gets a constant
+    mu = 0.0
+    if d == 0:
+        mu = w.mean()
+    w = w - mu
+
+    # Step 1: a long autoregression supplies residual estimates
+    long_order = min(int(np.log(n) ** 2), n // 4)
+    if long_order < 4 or n - long_order < 20:
+        return mean, lower, upper, False
+    ar = _levinson_ar(w, long_order)
+    resid = np.zeros(n)
+    for t in range(long_order, n):
+        pred = 0.0
+        for j in range(long_order):
+            pred += ar[j] * w[t - 1 - j]
+        resid[t] = w[t] - pred
+
+    # Step 2: least squares of w_t on w_{t-1}, w_{t-2}, e_{t-1}, e_{t-2}
+    start = long_order + 2
+    rows = n - start
+    design = np.empty((rows, 4))
+    target = np.empty(rows)
+    for i in range(rows):
+        t = start + i
+        design[i, 0] = w[t - 1]
+        design[i, 1] = w[t - 2]
+        design[i, 2] = resid[t - 1]
+        design[i, 3] = resid[t - 2]
+        target[i] = w[t]
+    gram = design.T @ design
+    # Overflowing products (huge values) would make det/solve raise under numba
+    if not np.isfinite(gram).all() or abs(np.linalg.det(gram)) < 1e-12:
+        return mean, lower, upper, False
+    params = np.linalg.solve(gram, design.T @ target)
+    if not _admissible(params):
+        return mean, lower, upper, False
+
+    # Step 3: polish by minimizing the conditional sum of squares, close to
+    # what statsmodels' likelihood fit optimizes; the regression estimates
+    # stay if the search doesn't improve on them
+    polished, polished_loss = _nelder_mead(params, w)
+    if polished_loss < _css(params, w):
+        params = polished
+    phi1, phi2, theta1, theta2 = params[0], params[1], params[2], params[3]
+
+    # Innovations under the fitted model
+    e = np.zeros(n)
+    for t in range(2, n):
+        e[t] = w[t] - phi1 * w[t - 1] - phi2 * w[t - 2] - theta1 * e[t - 1] - theta2 * e[t - 2]
+    sigma2 = 0.0
+    for t in range(2, n):
+        sigma2 += e[t] * e[t]
+    sigma2 /= n - 2
+
+    # Recursive forecast of the differenced series; future shocks are zero
+    w_prev1, w_prev2 = w[n - 1], w[n - 2]
+    e_prev1, e_prev2 = e[n - 1], e[n - 2]
+    w_hat = np.empty(horizon)
+    for h in range(horizon):
+        value = phi1 * w_prev1 + phi2 * w_prev2 + theta1 * e_prev1 + theta2 * e_prev2
+        w_hat[h] = value
+        w_prev2, w_prev1 = w_prev1, value
+        e_prev2, e_prev1 = e_prev1, 0.0
+
+    # psi weights of the ARMA part, then integrated d times
+    psi = np.empty(horizon)
+    for j in range(horizon):
+        value = 1.0 if j == 0 else 0.0
+        if j == 1:
+            value += theta1
+        elif j == 2:
+            value += theta2
+        if j >= 1:
+            value += phi1 * psi[j - 1]
+        if j >= 2:
+            value += phi2 * psi[j - 2]
+        psi[j] = value
+    for _ in range(d):
+        psi = np.cumsum(psi)
+
+    # Undo the differencing, innermost level first
+    forecast = w_hat + mu
+    for k in range(d - 1, -1, -1):
+        forecast = last_values[k] + np.cumsum(forecast)
+
+    variance = 0.0
+    for h in range(horizon):
+        variance += sigma2 * psi[h] * psi[h]
+        half_width = Z_95 * np.sqrt(variance)
+        mean[h] = forecast[h]
+        lower[h] = forecast[h] - half_width
+        upper[h] = forecast[h] + half_width
+
+    ok = np.isfinite(sigma2)
+    for h in range(horizon):
+        if not (np.isfinite(lower[h]) and np.isfinite(upper[h])):
+            ok = False
+    return mean, lower, upper, ok
@@ -22,7 +22,20 @@ try:
 except ImportError:
     STATSMODELS_AVAILABLE = False
 
-from app.services.forecasting.baseline import ForecastPoint, BaselineForecaster
+try:
+    from statsforecast.models import ARIMA as StatsForecastARIMA
+    STATSFORECAST_AVAILABLE = True
+except ImportError:
+    STATSFORECAST_AVAILABLE = False
+
+from app.services.forecasting.baseline import ForecastPoint, BaselineForecaster, _is_prepared
+from app.services.forecasting._arima_kernel import ar2ma2_forecast
+from app.config.settings import settings
+
+
+# Differencing order by rough series fingerprint (see _get_differencing_order)
+ADF_CACHE_SIZE = 4096
+_ADF_CACHE: Dict[tuple, int] = {}
 
 
 class ARIMAForecaster:
@@ -36,8 +49,14 @@ class ARIMAForecaster:
     
     MIN_DAYS_FOR_ARIMA = 60
     MIN_DAYS_FOR_MOVING_AVG = 30
+    ADF_LAGS = 7  # one week of daily lags in the stationarity test
     
-    def __init__(self, data: pd.DataFrame, exogenous_features: Optional[pd.DataFrame] = None):
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        exogenous_features: Optional[pd.DataFrame] = None,
+        assume_sorted: bool = False
+    ):
         """
         Initialize ARIMA forecaster.
         
@@ -45,10 +64,17 @@ class ARIMAForecaster:
             data: DataFrame with columns ['date', 'units_sold']
             exogenous_features: Optional DataFrame with exogenous variables
                                (e.g., is_weekend, is_festival)
+            assume_sorted: data already has datetime64 dates in ascending
+                           order, float32 units and a default index, so skip
+                           the copy/sort
         """
-        self.data = data.copy()
-        self.data['date'] = pd.to_datetime(self.data['date'])
-        self.data = self.data.sort_values('date').reset_index(drop=True)
+        if assume_sorted and _is_prepared(data):
+            self.data = data
+        else:
+            self.data = data.copy()
+            self.data['date'] = pd.to_datetime(self.data['date'])
+            self.data['units_sold'] = self.data['units_sold'].astype(np.float32)
+            self.data = self.data.sort_values('date').reset_index(drop=True)
         self.exog = exogenous_features
         
         # Fill missing dates with zeros
@@ -65,9 +91,19 @@ class ARIMAForecaster:
             freq='D'
         )
         
-        full_df = pd.DataFrame({'date': date_range})
-        self.data = full_df.merge(self.data, on='date', how='left')
-        self.data['units_sold'] = self.data['units_sold'].fillna(0)
+        if not self.data['date'].is_unique:
+            # reindex needs unique labels; repeated days keep every row
+            full_df = pd.DataFrame({'date': date_range})
+            self.data = full_df.merge(self.data, on='date', how='left')
+            self.data['units_sold'] = self.data['units_sold'].fillna(0).astype(np.float32)
+            return
+        
+        self.data = (
+            self.data.set_index('date')
+            .reindex(date_range, fill_value=0)
+            .rename_axis('date')
+            .reset_index()
+        )
     
     @property
     def days_of_data(self) -> int:
@@ -91,12 +127,12 @@ class ARIMAForecaster:
         """
         if self.days_of_data < self.MIN_DAYS_FOR_MOVING_AVG:
             # Not enough data, use naive baseline
-            baseline = BaselineForecaster(self.data)
+            baseline = BaselineForecaster(self.data, assume_sorted=True)
             return baseline.naive_forecast(horizon)
         
         if not self.can_use_arima():
             # Use moving average
-            baseline = BaselineForecaster(self.data)
+            baseline = BaselineForecaster(self.data, assume_sorted=True)
             return baseline.moving_average_forecast(horizon)
         
         # Use ARIMA
@@ -115,6 +151,20 @@ class ARIMAForecaster:
             # Determine differencing order
             d = self._get_differencing_order(ts)
             
+            # Opt-in JIT-compiled (2, d, 2) fit; statsmodels when the quick
+            # fit is unusable
+            if settings.ARIMA_BACKEND == "numba":
+                predicted, lower, upper, ok = ar2ma2_forecast(ts.to_numpy(dtype=np.float64), d, horizon)
+                if ok:
+                    return self._forecast_points(predicted, lower, upper)
+            
+            # Opt-in statsforecast fit of the same model, a few times faster
+            # than statsmodels; not installed or any failure falls through
+            if settings.ARIMA_BACKEND == "statsforecast" and STATSFORECAST_AVAILABLE:
+                points = self._statsforecast_points(ts, d, horizon)
+                if points is not None:
+                    return points
+            
             # Fit ARIMA model with reasonable defaults
             # Using (2, d, 2) as a reasonable starting point
             model = ARIMA(ts, order=(2, d, 2))
@@ -122,53 +172,95 @@ class ARIMAForecaster:
             
             # Generate forecast
             forecast_result = fitted.get_forecast(steps=horizon)
-            predicted = forecast_result.predicted_mean
             conf_int = forecast_result.conf_int(alpha=0.05)
             
-            # Build forecast points
-            last_date = self.data['date'].max()
-            forecasts = []
-            
-            for i in range(horizon):
-                forecast_date = (last_date + timedelta(days=i + 1)).date()
-                pred = max(0, predicted.iloc[i])  # No negative demand
-                
-                forecasts.append(ForecastPoint(
-                    date=forecast_date,
-                    predicted_units=round(pred, 2),
-                    confidence_lower=round(max(0, conf_int.iloc[i, 0]), 2),
-                    confidence_upper=round(conf_int.iloc[i, 1], 2)
-                ))
-            
-            return forecasts
+            return self._forecast_points(
+                forecast_result.predicted_mean.to_numpy(),
+                conf_int.iloc[:, 0].to_numpy(),
+                conf_int.iloc[:, 1].to_numpy()
+            )
             
         except Exception as e:
             # Fall back to moving average on any error
             print(f"ARIMA failed, falling back to moving average: {e}")
-            baseline = BaselineForecaster(self.data)
+            baseline = BaselineForecaster(self.data, assume_sorted=True)
             return baseline.moving_average_forecast(horizon)
     
+    def _statsforecast_points(self, ts: pd.Series, d: int, horizon: int) -> Optional[List[ForecastPoint]]:
+        """ARIMA(2, d, 2) forecast via statsforecast, or None if the fit fails."""
+        try:
+            model = StatsForecastARIMA(order=(2, d, 2)).fit(ts.to_numpy(dtype=np.float64))
+            forecast = model.predict(h=horizon, level=[95])
+            predicted = np.asarray(forecast['mean'], dtype=np.float64)
+            lower = np.asarray(forecast['lo-95'], dtype=np.float64)
+            upper = np.asarray(forecast['hi-95'], dtype=np.float64)
+        except Exception:
+            return None
+        if not (np.isfinite(lower).all() and np.isfinite(upper).all()):
+            return None
+        return self._forecast_points(predicted, lower, upper)
+    
+    def _forecast_points(self, predicted: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> List[ForecastPoint]:
+        """Build forecast points for the days after the last observation."""
+        last_date = self.data['date'].max()
+        
+        # No negative demand (fmax, like max(0, x), turns NaN into 0)
+        predicted = np.fmax(0, predicted).round(2).tolist()
+        lower = np.fmax(0, lower).round(2).tolist()
+        upper = np.round(upper, 2).tolist()
+        
+        return [
+            ForecastPoint(
+                date=(last_date + timedelta(days=i + 1)).date(),
+                predicted_units=pred,
+                confidence_lower=low,
+                confidence_upper=high
+            )
+            for i, (pred, low, high) in enumerate(zip(predicted, lower, upper))
+        ]
+    
     def _get_differencing_order(self, ts: pd.Series) -> int:
         """
         Determine differencing order using ADF test.
         
+        Series with the same length, mean, spread and endpoints (flat or
+        all-zero SKUs are common) reuse an earlier decision instead of
+        re-running the tests.
+        
         Returns:
             0 if stationary, 1 if needs first differencing, 2 max
         """
+        key = (
+            len(ts),
+            round(float(ts.mean()), 3),
+            round(float(ts.std()), 3),
+            round(float(ts.iloc[0]), 3),
+            round(float(ts.iloc[-1]), 3),
+        )
+        d = _ADF_CACHE.get(key)
+        if d is None:
+            d = self._adf_differencing_order(ts)
+            if len(_ADF_CACHE) >= ADF_CACHE_SIZE:
+                _ADF_CACHE.clear()
+            _ADF_CACHE[key] = d
+        return d
+    
+    def _adf_differencing_order(self, ts: pd.Series) -> int:
         try:
-            # Test original series
-            result = adfuller(ts.dropna(), autolag='AIC')
+            # Test original series with a fixed week of lags; an AIC lag
+            # search is one OLS fit per candidate lag
+            result = adfuller(
+                ts.dropna().to_numpy(dtype=np.float64),
+                maxlag=self.ADF_LAGS,
+                autolag=None,
+                regression='c'
+            )
             if result[1] < 0.05:  # p-value < 0.05, stationary
                 return 0
             
-            # Test first difference
-            diff1 = ts.diff().dropna()
-            if len(diff1) > 10:
-                result = adfuller(diff1, autolag='AIC')
-                if result[1] < 0.05:
-                    return 1
-            
-            return 1  # Default to 1 if tests fail
+            # Whether or not the first difference tests stationary, one
+            # difference is what we fit, so it isn't tested
+            return 1
         except Exception:
             return 1  # Safe default
     
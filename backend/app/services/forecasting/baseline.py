@@ -15,13 +15,62 @@ from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ForecastPoint:
-    """Single forecast data point."""
+    """Single forecast data point (immutable; built per SKU-day, so no __dict__)."""
     date: date
     predicted_units: float
     confidence_lower: Optional[float] = None
     confidence_upper: Optional[float] = None
+    
+    def __reduce__(self):
+        # Frozen slots dataclasses can't be unpickled on Python 3.10
+        # (bpo-45897); forecast worker processes return these, so rebuild
+        # through __init__
+        return (ForecastPoint, (self.date, self.predicted_units, self.confidence_lower, self.confidence_upper))
+
+
+def _is_prepared(data: pd.DataFrame) -> bool:
+    """True if data has datetime64 dates in ascending order and float32 units."""
+    dates = data['date']
+    return (
+        pd.api.types.is_datetime64_any_dtype(dates)
+        and dates.is_monotonic_increasing
+        and data['units_sold'].dtype == np.float32
+    )
+
+
+# Batch forecast layout: one record per forecast day, fields side by side
+# instead of one ForecastPoint object each
+FORECAST_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('pred', 'f4'),
+    ('lo', 'f4'),
+    ('hi', 'f4'),
+])
+
+
+def to_forecast_points(forecast: np.ndarray) -> List[ForecastPoint]:
+    """Convert a FORECAST_DTYPE array into ForecastPoints."""
+    dates = forecast['date'].astype(object).tolist()
+    # Back to float64 at 2 decimals, dropping the float32 representation error
+    pred = forecast['pred'].astype(np.float64).round(2).tolist()
+    lo = forecast['lo'].astype(np.float64).round(2).tolist()
+    hi = forecast['hi'].astype(np.float64).round(2).tolist()
+    return [
+        ForecastPoint(date=d, predicted_units=p, confidence_lower=l, confidence_upper=h)
+        for d, p, l, h in zip(dates, pred, lo, hi)
+    ]
+
+
+def from_forecast_points(points: List[ForecastPoint]) -> np.ndarray:
+    """Pack ForecastPoints into a FORECAST_DTYPE array (inverse of to_forecast_points)."""
+    forecast = np.empty(len(points), dtype=FORECAST_DTYPE)
+    forecast['date'] = [p.date for p in points]
+    forecast['pred'] = [p.predicted_units for p in points]
+    forecast['lo'] = [p.confidence_lower for p in points]
+    forecast['hi'] = [p.confidence_upper for p in points]
+    return forecast
 
 
 class BaselineForecaster:
@@ -30,16 +79,25 @@ class BaselineForecaster:
     These should be your first try - if ARIMA doesn't beat these, stop.
     """
     
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, assume_sorted: bool = False):
         """
         Initialize with sales data.
         
         Args:
             data: DataFrame with columns ['date', 'units_sold']
+            assume_sorted: data already has datetime64 dates in ascending
+                           order and float32 units (e.g. an ARIMAForecaster's
+                           prepared frame), so use it as-is instead of
+                           copying and sorting
         """
-        self.data = data.copy()
-        self.data['date'] = pd.to_datetime(self.data['date'])
-        self.data = self.data.sort_values('date')
+        if assume_sorted and _is_prepared(data):
+            self.data = data
+        else:
+            self.data = data.copy()
+            self.data['date'] = pd.to_datetime(self.data['date'])
+            # Daily unit counts fit float32 comfortably; half the bytes to scan
+            self.data['units_sold'] = self.data['units_sold'].astype(np.float32)
+            self.data = self.data.sort_values('date')
     
     @property
     def days_of_data(self) -> int:
@@ -55,8 +113,37 @@ class BaselineForecaster:
         This is the simplest possible forecast.
         If your fancy model can't beat this, it's useless.
         """
+        recent = self.data['units_sold'].to_numpy()[-7:]
+        if len(recent) > 1 and recent.min() == recent.max():
+            # Flat week (dead stock sits at 0): std is 0, so the interval
+            # collapses onto the value and there is nothing to compute
+            value = round(float(recent[0]), 2)
+            lower = max(0.0, value)
+            last_date = self.data['date'].max()
+            return [
+                ForecastPoint(
+                    date=(last_date + timedelta(days=i)).date(),
+                    predicted_units=value,
+                    confidence_lower=lower,
+                    confidence_upper=value
+                )
+                for i in range(1, horizon + 1)
+            ]
+        
+        return to_forecast_points(self.naive_forecast_arrays(horizon))
+    
+    def naive_forecast_arrays(self, horizon: int = 7) -> np.ndarray:
+        """
+        Same forecast as naive_forecast, as a FORECAST_DTYPE array for
+        callers that serialize or transform the whole horizon at once.
+        """
+        forecast = np.zeros(horizon, dtype=FORECAST_DTYPE)
+        steps = np.arange(1, horizon + 1)
+        
         if len(self.data) == 0:
-            return self._empty_forecast(horizon)
+            # Zero forecast when no data available
+            forecast['date'] = np.datetime64(date.today(), 'D') + steps
+            return forecast
         
         # Get last 7 days average (or whatever is available)
         lookback = min(7, len(self.data))
@@ -64,20 +151,41 @@ class BaselineForecaster:
         avg = recent_data['units_sold'].mean()
         std = recent_data['units_sold'].std() if len(recent_data) > 1 else avg * 0.2
         
-        # Generate forecast points
         last_date = self.data['date'].max()
-        forecasts = []
-        
-        for i in range(1, horizon + 1):
-            forecast_date = (last_date + timedelta(days=i)).date()
-            forecasts.append(ForecastPoint(
-                date=forecast_date,
-                predicted_units=round(avg, 2),
-                confidence_lower=round(max(0, avg - 1.96 * std), 2),
-                confidence_upper=round(avg + 1.96 * std, 2)
-            ))
-        
-        return forecasts
+        forecast['date'] = np.datetime64(last_date.date(), 'D') + steps
+        forecast['pred'] = round(avg, 2)
+        forecast['lo'] = round(max(0, avg - 1.96 * std), 2)
+        forecast['hi'] = round(avg + 1.96 * std, 2)
+        return forecast
+    
+    @staticmethod
+    def naive_forecast_batch(sales: np.ndarray, horizon: int = 7) -> np.ndarray:
+        """
+        Naive baseline for many series in one pass.
+        
+        Args:
+            sales: (n_series, n_days) daily units, most recent day last.
+                   Series shorter than the matrix are left-padded with NaN;
+                   each needs at least one value.
+        
+        Returns:
+            (n_series, horizon, 3) array of (predicted, lower, upper), the
+            unrounded values naive_forecast would give each series
+        """
+        recent = sales[:, -7:]
+        present = ~np.isnan(recent)
+        counts = present.sum(axis=1)
+        
+        avg = np.where(present, recent, 0.0).sum(axis=1) / counts
+        deviations = np.where(present, recent - avg[:, None], 0.0)
+        variance = (deviations ** 2).sum(axis=1) / np.maximum(counts - 1, 1)
+        std = np.where(counts > 1, np.sqrt(variance), avg * 0.2)
+        
+        result = np.empty((len(sales), horizon, 3))
+        result[:, :, 0] = avg[:, None]
+        result[:, :, 1] = np.maximum(0, avg - 1.96 * std)[:, None]
+        result[:, :, 2] = (avg + 1.96 * std)[:, None]
+        return result
     
     def moving_average_forecast(
         self, 
@@ -93,15 +201,19 @@ class BaselineForecaster:
         if len(self.data) < 3:
             return self.naive_forecast(horizon)
         
-        # Calculate moving average
-        self.data['ma'] = self.data['units_sold'].rolling(
-            window=min(window, len(self.data)), 
-            min_periods=1
-        ).mean()
+        # Calculate moving average from running totals (kept off self.data,
+        # which may be shared); the first window-1 days average what exists
+        window = min(window, len(self.data))
+        units = self.data['units_sold'].to_numpy(dtype=np.float64)
+        totals = np.concatenate(([0.0], units.cumsum()))
+        ma = np.concatenate((
+            totals[1:window] / np.arange(1, window),
+            (totals[window:] - totals[:-window]) / window
+        ))
         
         # Simple trend: difference between recent and older MA
-        recent_ma = self.data['ma'].tail(3).mean()
-        older_ma = self.data['ma'].head(max(3, len(self.data) // 2)).mean()
+        recent_ma = ma[-3:].mean()
+        older_ma = ma[:max(3, len(self.data) // 2)].mean()
         
         # Trend per day
         days_between = max(1, len(self.data) // 2)
@@ -112,41 +224,31 @@ class BaselineForecaster:
         daily_trend = np.clip(daily_trend, -max_trend, max_trend)
         
         # Standard deviation for confidence intervals
-        std = self.data['units_sold'].std()
+        std = units.std(ddof=1)
         
         # Generate forecasts
         last_date = self.data['date'].max()
-        base_value = self.data['ma'].iloc[-1]
-        forecasts = []
-        
-        for i in range(1, horizon + 1):
-            forecast_date = (last_date + timedelta(days=i)).date()
-            predicted = base_value + (daily_trend * i)
-            predicted = max(0, predicted)  # No negative demand
-            
-            # Widen confidence interval further into future
-            ci_width = std * (1 + 0.1 * i)
-            
-            forecasts.append(ForecastPoint(
-                date=forecast_date,
-                predicted_units=round(predicted, 2),
-                confidence_lower=round(max(0, predicted - 1.96 * ci_width), 2),
-                confidence_upper=round(predicted + 1.96 * ci_width, 2)
-            ))
-        
-        return forecasts
-    
-    def _empty_forecast(self, horizon: int) -> List[ForecastPoint]:
-        """Return zero forecast when no data available."""
-        today = date.today()
+        base_value = ma[-1]
+        steps = np.arange(1, horizon + 1)
+        
+        predicted = base_value + (daily_trend * steps)
+        predicted = np.fmax(0, predicted)  # No negative demand
+        
+        # Widen confidence interval further into future
+        ci_width = std * (1 + 0.1 * steps)
+        
+        lower = np.fmax(0, predicted - 1.96 * ci_width).round(2).tolist()
+        upper = (predicted + 1.96 * ci_width).round(2).tolist()
+        predicted = predicted.round(2).tolist()
+        
         return [
             ForecastPoint(
-                date=today + timedelta(days=i),
-                predicted_units=0,
-                confidence_lower=0,
-                confidence_upper=0
+                date=(last_date + timedelta(days=i)).date(),
+                predicted_units=predicted[i - 1],
+                confidence_lower=lower[i - 1],
+                confidence_upper=upper[i - 1]
             )
-            for i in range(1, horizon + 1)
+            for i in steps.tolist()
         ]
 
 
@@ -166,9 +268,23 @@ def calculate_velocity_change(
     if len(data) < recent_days + compare_days:
         return 0.0
     
-    data = data.sort_values('date')
-    recent = data.tail(recent_days)['units_sold'].mean()
-    previous = data.tail(recent_days + compare_days).head(compare_days)['units_sold'].mean()
+    if not data['date'].is_monotonic_increasing:
+        data = data.sort_values('date')
+    return velocity_change_from_units(data['units_sold'].to_numpy(), recent_days, compare_days)
+
+
+def velocity_change_from_units(
+    units: np.ndarray,
+    recent_days: int = 7,
+    compare_days: int = 7
+) -> float:
+    """calculate_velocity_change for units already in date order."""
+    if len(units) < recent_days + compare_days:
+        return 0.0
+    
+    units = np.asarray(units, dtype=np.float64)
+    recent = units[-recent_days:].mean()
+    previous = units[-(recent_days + compare_days):-recent_days].mean()
     
     if previous == 0:
         return 100.0 if recent > 0 else 0.0
@@ -1,28 +1,89 @@
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from datetime import date, timedelta
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.models import Store, SKU, SalesTransaction, ForecastResult, ForecastModel
-from app.services.forecasting.baseline import BaselineForecaster, ForecastPoint, calculate_velocity_change
+from app.services.forecasting.baseline import (
+    BaselineForecaster, ForecastPoint, from_forecast_points, to_forecast_points, velocity_change_from_units
+)
 from app.services.forecasting.arima import ARIMAForecaster
+from app.config.settings import settings
 
 
 import concurrent.futures
+import logging
 import os
+import threading
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
 
 # Persistent process pool for CPU-bound forecasting tasks
 # Initialized on first use to avoid overhead if not used
 _forecast_pool = None
+_forecast_pool_lock = threading.Lock()
+
+# Limit to 2-4 workers for local Kirana app to avoid memory pressure
+FORECAST_POOL_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Sales history handed to forecasting, one row per transaction; the pool
+# reads it from shared memory instead of unpickling rows per task
+HISTORY_DTYPE = np.dtype([('date', 'datetime64[D]'), ('units_sold', 'f4')])
+
+# date.toordinal() of 1970-01-01, to turn datetime64[D] day counts into ordinals
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+@dataclass(slots=True)
+class _WorkerResult:
+    """One SKU's forecast as returned by the worker functions (no __dict__ per SKU)."""
+    sku_id: str
+    sku_name: str
+    forecasts: list  # ForecastPoints; a FORECAST_DTYPE array while crossing the pool
+    model_used: str
+    velocity_change: float = 0.0
+
+# Seconds a store's pool batches get; SKUs still unfinished then get the
+# naive forecast
+FORECAST_POOL_TIMEOUT = 30
+
+# Sales rows fetched per round trip when streaming a store's history
+HISTORY_FETCH_BATCH = 10000
 
 def get_forecast_pool():
     global _forecast_pool
-    if _forecast_pool is None:
-        # Limit to 2-4 workers for local Kirana app to avoid memory pressure
-        max_workers = min(os.cpu_count() or 1, 4)
-        print(f"Initializing persistent forecast pool with {max_workers} workers...")
-        _forecast_pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
-    return _forecast_pool
+    # Concurrent forecast requests must not each start a pool
+    with _forecast_pool_lock:
+        if _forecast_pool is None:
+            print(f"Initializing persistent forecast pool with {FORECAST_POOL_WORKERS} workers...")
+            _forecast_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=FORECAST_POOL_WORKERS,
+                initializer=_init_forecast_worker
+            )
+        return _forecast_pool
+
+def _init_forecast_worker():
+    """
+    Pool initializer: run one ARIMA forecast on a synthetic series so each
+    worker pays for statsmodels' lazy imports and JIT/cache loading before
+    its first real batch, not during it.
+    """
+    try:
+        days = settings.MIN_DATA_DAYS_ARIMA + 30
+        rng = np.random.default_rng(0)
+        units = 10 + 3 * np.sin(2 * np.pi * np.arange(days) / 7) + rng.normal(0, 1, days)
+        rows = np.empty(days, dtype=HISTORY_DTYPE)
+        rows['date'] = np.datetime64('2024-01-01', 'D') + np.arange(days)
+        rows['units_sold'] = units
+        ARIMAForecaster(_history_frame(rows), assume_sorted=True).forecast(7)
+    except Exception as e:
+        # A cold worker is only slower; never stop the pool from starting
+        logger.warning(f"Forecast worker warm-up failed: {e}")
 
 class ForecasterService:
     """
@@ -63,26 +124,32 @@ class ForecasterService:
         relevant_sku_ids = list(sku_map.keys())
         
         # Optimization: Filter by relevant SKUs and get only needed columns
-        transactions = self.db.query(SalesTransaction.sku_id, SalesTransaction.date, SalesTransaction.units_sold).filter(
+        query = self.db.query(SalesTransaction.sku_id, SalesTransaction.date, SalesTransaction.units_sold).filter(
             SalesTransaction.store_id == store.id,
             SalesTransaction.sku_id.in_(relevant_sku_ids)
-        ).order_by(SalesTransaction.date).all()
+        )
         
-        # Group data by SKU in memory (Faster than multiple queries)
-        from collections import defaultdict
-        data_by_sku = defaultdict(list)
-        for t in transactions:
-            data_by_sku[t.sku_id].append({
-                'date': t.date,
-                'units_sold': t.units_sold
-            })
+        # Stream rows a batch at a time into arrays sized by a COUNT, so
+        # years of sales never sit in memory as Row objects all at once.
+        # Options are per statement: the session's connection stays unbuffered
+        row_skus, history = _fetch_history(
+            self.db.execute(
+                query.order_by(SalesTransaction.date).statement,
+                execution_options={"stream_results": True, "yield_per": HISTORY_FETCH_BATCH}
+            ),
+            query.count()
+        )
+        
+        # Group data by SKU in memory (Faster than multiple queries): one
+        # columnar history, SKU-contiguous and date-ordered within each SKU
+        history, bounds = _group_history(row_skus, history, relevant_sku_ids)
             
-        # 3. Prepare Tasks
+        # 3. Prepare Tasks: each SKU is a (start, end) slice of the history
         tasks = []
         for sku_db_id, sku_obj in sku_map.items():
-            records = data_by_sku.get(sku_db_id, [])
-            if records:
-                tasks.append((sku_obj.sku_id, sku_obj.sku_name, records, horizon))
+            start, end = bounds[sku_db_id]
+            if end > start:
+                tasks.append((sku_obj.sku_id, sku_obj.sku_name, start, end, horizon))
 
         # 4. Run Parallel (Persistent Pool)
         results = {}
@@ -90,42 +157,98 @@ class ForecasterService:
         if not tasks:
             return {}
 
-        pool = get_forecast_pool()
+        def collect(res):
+            if res:
+                results[res.sku_id] = {
+                    'sku_name': res.sku_name,
+                    'forecasts': res.forecasts,
+                    'model_used': res.model_used,
+                    'velocity_change': res.velocity_change
+                }
+
+        # Outcomes stay in task order however they were computed
+        outcomes = [None] * len(tasks)
         
-        try:
-            # Submit all tasks to the persistent pool
-            futures = [pool.submit(_worker_forecast_sku, *task) for task in tasks]
+        # Short histories only get the naive forecast: one numpy pass for all
+        naive_idx = [i for i, task in enumerate(tasks) if _naive_window(history[task[2]:task[3]]) is not None]
+        if naive_idx:
+            naive_results = _forecast_naive_batch([tasks[i] for i in naive_idx], history)
+            for i, res in zip(naive_idx, naive_results):
+                outcomes[i] = res
+        
+        rest_idx = [i for i in range(len(tasks)) if outcomes[i] is None]
+        rest = [tasks[i] for i in rest_idx]
+
+        # Only ARIMA fits are worth shipping to another process; stores with
+        # nothing but short histories (moving average) are faster in-process
+        if not any(end - start >= settings.MIN_DATA_DAYS_ARIMA for _, _, start, end, _ in rest):
+            for i, task in zip(rest_idx, rest):
+                outcomes[i] = _forecast_task(task, history)
+        else:
+            pool = get_forecast_pool()
+            # Indices into tasks still to forecast here, if the pool fails them
+            pending = set(rest_idx)
+            # Indices whose batch overran the budget; these are not refit
+            timed_out = set()
             
-            # Wait for completion with a timeout to avoid hanging
-            for future in concurrent.futures.as_completed(futures, timeout=30):
-                try:
-                    res = future.result()
-                    if res:
-                        results[res['sku_id']] = {
-                            'sku_name': res['sku_name'],
-                            'forecasts': res['forecasts'],
-                            'model_used': res['model_used'],
-                            'velocity_change': res.get('velocity_change', 0.0)
-                        }
-                except Exception as e:
-                    print(f"Forecast worker failed: {e}")
-                    continue
-        except Exception as e:
-            print(f"Persistent pool execution failed ({e}), falling back to serial...")
-            # Fallback to serial for robustness
-            for task in tasks:
+            try:
+                # A few batches per worker: IPC is paid per batch rather than
+                # per SKU, yet slow ARIMA fits still balance across workers.
+                # Batches carry slice bounds only; workers read the rows from
+                # shared memory. The worker never raises
+                chunksize = max(1, len(rest) // (FORECAST_POOL_WORKERS * 4))
+                with _shared_history(history) as shm_name:
+                    worker = partial(_worker_forecast_sku_batch, shm_name, len(history))
+                    batches = {
+                        pool.submit(worker, rest[start:start + chunksize]): rest_idx[start:start + chunksize]
+                        for start in range(0, len(rest), chunksize)
+                    }
+                    # One budget for the whole store: finished batches are kept
+                    # however long the slowest one takes. Queued batches past it
+                    # are cancelled; running ones finish on the shared pool and
+                    # are ignored (any that already left the queue fail fast on
+                    # the unlinked block rather than refitting)
+                    done, not_done = concurrent.futures.wait(batches, timeout=FORECAST_POOL_TIMEOUT)
+                    for future in not_done:
+                        future.cancel()
+                        timed_out.update(batches[future])
+                
+                for future in done:
+                    if future.exception() is not None:
+                        continue
+                    batch_idx = batches[future]
+                    for i, res in zip(batch_idx, future.result()):
+                        if res:
+                            res.forecasts = to_forecast_points(res.forecasts)
+                        outcomes[i] = res
+                    pending.difference_update(batch_idx)
+                
+                if timed_out:
+                    logger.warning(
+                        f"Pool forecast for store {store_id} overran {FORECAST_POOL_TIMEOUT}s, "
+                        f"using the naive forecast for {', '.join(tasks[i][1] for i in sorted(timed_out))}"
+                    )
+                    for i in sorted(timed_out):
+                        outcomes[i] = _forecast_naive_task(tasks[i], history)
+                    pending.difference_update(timed_out)
+                
+                if pending:
+                    logger.warning(
+                        f"Pool forecast failed for "
+                        f"{', '.join(tasks[i][1] for i in sorted(pending))}, running them serially..."
+                    )
+            except Exception as e:
+                logger.warning(f"Persistent pool execution failed ({e}), falling back to serial...")
+            
+            # Fallback to serial for robustness (failed batches, not slow ones)
+            for i in sorted(pending):
                 try:
-                    res = _worker_forecast_sku(*task)
-                    if res:
-                        results[res['sku_id']] = {
-                            'sku_name': res['sku_name'],
-                            'forecasts': res['forecasts'],
-                            'model_used': res['model_used'],
-                            'velocity_change': res.get('velocity_change', 0.0)
-                        }
+                    outcomes[i] = _forecast_task(tasks[i], history)
                 except Exception as inner_e:
-                    print(f"Serial forecast failed for {task[1]}: {inner_e}")
+                    logger.warning(f"Serial forecast failed for {tasks[i][1]}: {inner_e}")
 
+        for res in outcomes:
+            collect(res)
         return results
 
     def generate_insights(self, forecasts: dict) -> List[str]:
@@ -176,30 +299,27 @@ class ForecasterService:
             
         return insights
 
-    def generate_insights_from_schema(self, forecasts: List['ForecastResultSchema']) -> List[str]:
+    def generate_insights_from_totals(
+        self,
+        total_predicted_volume: float,
+        sku_totals: Dict[str, Tuple[str, float]]
+    ) -> List[str]:
         """
-        Generate insights from ForecastResultSchema objects (for get_forecast endpoint).
+        Generate insights from forecast totals (for get_forecast endpoint):
+        sku_totals maps sku_id -> (sku_name, predicted units), in the order
+        the SKUs first appear.
         """
-        if not forecasts:
+        if not sku_totals:
             return ["No forecast data available to generate insights."]
             
-        # Group by SKU
-        from collections import defaultdict
-        sku_groups = defaultdict(list)
-        for r in forecasts:
-            sku_groups[r.sku_id].append(r)
-            
         # Calculate stats
-        total_predicted_volume = sum(r.predicted_units for r in forecasts)
         top_product = None
         max_demand = -1
         
-        for sku_id, items in sku_groups.items():
-            vol = sum(i.predicted_units for i in items)
+        for sku_name, vol in sku_totals.values():
             if vol > max_demand:
                  max_demand = vol
-                 # Get name from first item
-                 top_product = items[0].sku_name
+                 top_product = sku_name
                  
         # Generate text
         insights = []
@@ -232,7 +352,9 @@ class ForecasterService:
         skus = self.db.query(SKU).filter(SKU.store_id == store.id).all()
         sku_map = {s.sku_id: s.id for s in skus}
         
-        forecast_objects = []
+        # Plain row dicts for one executemany insert; no ORM objects or
+        # identity-map bookkeeping per forecast day
+        rows = []
         
         for sku_id_str, sku_data in forecasts.items():
             if sku_id_str not in sku_map:
@@ -248,16 +370,16 @@ class ForecasterService:
                 model_type = ForecastModel.MOVING_AVERAGE
             
             for forecast_point in sku_data['forecasts']:
-                forecast_objects.append(ForecastResult(
-                    store_id=store.id,
-                    sku_id=sku_db_id,
-                    forecast_date=forecast_point.date,
-                    predicted_units=forecast_point.predicted_units,
-                    confidence_lower=forecast_point.confidence_lower,
-                    confidence_upper=forecast_point.confidence_upper,
-                    model_used=model_type,
-                    forecast_horizon=horizon
-                ))
+                rows.append({
+                    'store_id': store.id,
+                    'sku_id': sku_db_id,
+                    'forecast_date': forecast_point.date,
+                    'predicted_units': forecast_point.predicted_units,
+                    'confidence_lower': forecast_point.confidence_lower,
+                    'confidence_upper': forecast_point.confidence_upper,
+                    'model_used': model_type,
+                    'forecast_horizon': horizon,
+                })
 
         # Faster: Delete ALL forecasts for this Store + Horizon (simple)
         forecasted_sku_db_ids = [sku_map[sid] for sid in forecasts.keys() if sid in sku_map]
@@ -269,44 +391,223 @@ class ForecasterService:
                  ForecastResult.forecast_date >= date.today()
              ).delete(synchronize_session=False)
 
-        if forecast_objects:
-            self.db.bulk_save_objects(forecast_objects)
+        # Delete and insert share the session's transaction: one commit, and
+        # readers never see the store without forecasts
+        if rows:
+            self.db.execute(insert(ForecastResult.__table__), rows)
+        if forecasted_sku_db_ids:
             self.db.commit()
             
-        return len(forecast_objects)
+        return len(rows)
+
+
+def _fetch_history(result, expected_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Read (sku_id, date, units_sold) rows from a streamed result into a
+    sku_id array and a HISTORY_DTYPE array. Sized for expected_rows; rows
+    that arrive past it (sales written after the count) are appended.
+    """
+    row_skus = np.empty(expected_rows, dtype=np.int64)
+    history = np.empty(expected_rows, dtype=HISTORY_DTYPE)
+    extra = []
+    filled = 0
+    for rows in result.partitions():
+        sku_col, date_col, units_col = zip(*rows)
+        # Day numbers via toordinal(); numpy converts date objects far slower
+        date_col = (
+            np.fromiter(map(date.toordinal, date_col), dtype=np.int64, count=len(rows)) - _EPOCH_ORDINAL
+        ).astype('datetime64[D]')
+        take = min(len(rows), expected_rows - filled)
+        if take:
+            row_skus[filled:filled + take] = sku_col[:take]
+            history['date'][filled:filled + take] = date_col[:take]
+            history['units_sold'][filled:filled + take] = units_col[:take]
+            filled += take
+        if take < len(rows):
+            overflow = np.empty(len(rows) - take, dtype=HISTORY_DTYPE)
+            overflow['date'] = date_col[take:]
+            overflow['units_sold'] = units_col[take:]
+            extra.append((np.asarray(sku_col[take:], dtype=np.int64), overflow))
+    
+    row_skus, history = row_skus[:filled], history[:filled]
+    if extra:
+        row_skus = np.concatenate([row_skus] + [skus for skus, _ in extra])
+        history = np.concatenate([history] + [rows for _, rows in extra])
+    return row_skus, history
+
+
+def _group_history(
+    row_skus: np.ndarray,
+    history: np.ndarray,
+    sku_db_ids: List[int]
+) -> Tuple[np.ndarray, Dict[int, Tuple[int, int]]]:
+    """
+    Regroup date-ordered HISTORY_DTYPE rows (row_skus[i] owning history[i])
+    by SKU, plus each SKU's (start, end) slice.
+    """
+    # Stable, so each SKU's rows keep the query's date order
+    order = np.argsort(row_skus, kind='stable')
+    row_skus, history = row_skus[order], history[order]
+    
+    keys = np.asarray(sku_db_ids, dtype=np.int64)
+    starts = np.searchsorted(row_skus, keys, side='left').tolist()
+    ends = np.searchsorted(row_skus, keys, side='right').tolist()
+    return history, dict(zip(sku_db_ids, zip(starts, ends)))
+
+
+@contextmanager
+def _shared_history(history: np.ndarray) -> Iterator[str]:
+    """Copy history into a shared memory block for the pool; yields its name."""
+    shm = shared_memory.SharedMemory(create=True, size=max(history.nbytes, 1))
+    try:
+        np.ndarray(history.shape, dtype=HISTORY_DTYPE, buffer=shm.buf)[:] = history
+        yield shm.name
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _history_frame(rows: np.ndarray) -> pd.DataFrame:
+    """One SKU's history rows as the ['date', 'units_sold'] frame forecasters take."""
+    return pd.DataFrame({
+        'date': rows['date'].astype('datetime64[ns]'),
+        'units_sold': rows['units_sold']
+    })
+
+
+def _naive_window(rows: np.ndarray) -> Optional[np.ndarray]:
+    """
+    The last 7 gap-filled days of one SKU's history rows (NaN-padded when
+    shorter), or None if ARIMAForecaster would not pick the naive model
+    for it. Repeated dates are left to ARIMAForecaster.
+    """
+    dates = rows['date']
+    days = int((dates[-1] - dates[0]) // np.timedelta64(1, 'D')) + 1
+    if days >= ARIMAForecaster.MIN_DAYS_FOR_MOVING_AVG:
+        return None
+    if (np.diff(dates) == np.timedelta64(0, 'D')).any():
+        return None
+    
+    window = np.full(7, np.nan)
+    window[7 - min(days, 7):] = 0.0
+    ages = (dates[-1] - dates[-7:]) // np.timedelta64(1, 'D')
+    recent = ages < 7
+    window[6 - ages[recent]] = rows['units_sold'][-7:][recent]
+    return window
+
+
+def _forecast_naive_batch(tasks: List[tuple], history: np.ndarray) -> List[_WorkerResult]:
+    """_worker_forecast_sku results for naive-tier SKUs, forecast together."""
+    horizon = tasks[0][4]
+    values = BaselineForecaster.naive_forecast_batch(
+        np.stack([_naive_window(history[task[2]:task[3]]) for task in tasks]), horizon
+    )
+    
+    results = []
+    for (sku_id, sku_name, start, end, _), sku_values in zip(tasks, values.tolist()):
+        rows = history[start:end]
+        last_date = rows['date'][-1].item()
+        forecasts = [
+            ForecastPoint(
+                date=last_date + timedelta(days=i + 1),
+                predicted_units=round(predicted, 2),
+                confidence_lower=round(lower, 2),
+                confidence_upper=round(upper, 2)
+            )
+            for i, (predicted, lower, upper) in enumerate(sku_values)
+        ]
+        velocity_change = velocity_change_from_units(rows['units_sold'])
+        results.append(_WorkerResult(
+            sku_id=sku_id,
+            sku_name=sku_name,
+            forecasts=forecasts,
+            model_used='naive',
+            velocity_change=velocity_change
+        ))
+    return results
+
+
+def _forecast_task(task: tuple, history: np.ndarray) -> Optional[_WorkerResult]:
+    """Run one (sku_id, sku_name, start, end, horizon) task in this process."""
+    sku_id, sku_name, start, end, horizon = task
+    return _worker_forecast_sku(sku_id, sku_name, history[start:end], horizon)
+
+
+def _forecast_naive_task(task: tuple, history: np.ndarray) -> Optional[_WorkerResult]:
+    """The naive forecast for one task, for SKUs whose ARIMA fit overran."""
+    sku_id, sku_name, start, end, horizon = task
+    rows = history[start:end]
+    try:
+        # ARIMAForecaster fills the missing days the naive window averages over
+        days = ARIMAForecaster(_history_frame(rows), assume_sorted=True).data
+        forecasts = BaselineForecaster(days, assume_sorted=True).naive_forecast(horizon)
+    except Exception as e:
+        logger.warning(f"Naive forecast failed for {sku_name}: {e}")
+        return None
+    return _WorkerResult(
+        sku_id=sku_id,
+        sku_name=sku_name,
+        forecasts=forecasts,
+        model_used='naive',
+        velocity_change=velocity_change_from_units(rows['units_sold'])
+    )
 
 
 # --- WORKER FUNCTIONS (Must be at module level for ProcessPoolExecutor) ---
 
-def _worker_forecast_sku(sku_id, sku_name, records, horizon):
+def _worker_forecast_sku_batch(shm_name, n_rows, tasks):
+    """
+    Worker task to forecast several SKUs in one call, reading their rows
+    from the shared history block. Results line up with tasks (None where
+    a SKU failed). Forecasts come back as FORECAST_DTYPE arrays, float32
+    fields instead of one pickled ForecastPoint per day.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        history = np.ndarray((n_rows,), dtype=HISTORY_DTYPE, buffer=shm.buf)
+        # Copy each slice out so nothing references the block once closed
+        results = [
+            _worker_forecast_sku(sku_id, sku_name, history[start:end].copy(), horizon)
+            for sku_id, sku_name, start, end, horizon in tasks
+        ]
+        del history
+        for res in results:
+            if res:
+                res.forecasts = from_forecast_points(res.forecasts)
+        return results
+    finally:
+        shm.close()
+
+def _worker_forecast_sku(sku_id, sku_name, rows, horizon):
     """
-    Worker task to forecast a single SKU.
+    Worker task to forecast a single SKU from its HISTORY_DTYPE rows.
     Runs in a separate process for CPU parallelism.
     """
     try:
-        if not records:
+        if not len(rows):
             return None
             
-        # Convert records to DataFrame
-        df = pd.DataFrame(records)
-        df['date'] = pd.to_datetime(df['date'])
+        # Convert rows to DataFrame; history rows are date-ordered with
+        # datetime64 dates and float32 units, so the forecaster takes the
+        # frame as-is (no to_datetime, copy or sort per SKU)
+        df = _history_frame(rows)
         
         # 1. Calculate Velocity Change (for insights)
-        velocity_change = calculate_velocity_change(df)
+        velocity_change = velocity_change_from_units(rows['units_sold'])
         
         # 2. Run Forecast
         # ARIMAForecaster automatically selects best model based on data length
-        forecaster = ARIMAForecaster(df)
+        forecaster = ARIMAForecaster(df, assume_sorted=True)
         forecasts = forecaster.forecast(horizon)
         model_used = forecaster.get_model_used()
         
-        return {
-            'sku_id': sku_id,
-            'sku_name': sku_name,
-            'forecasts': forecasts,
-            'model_used': model_used,
-            'velocity_change': velocity_change
-        }
+        return _WorkerResult(
+            sku_id=sku_id,
+            sku_name=sku_name,
+            forecasts=forecasts,
+            model_used=model_used,
+            velocity_change=velocity_change
+        )
     except Exception as e:
         print(f"Error in _worker_forecast_sku for {sku_name}: {e}")
         return None
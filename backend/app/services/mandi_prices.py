@@ -7,6 +7,7 @@ to fetch current market prices for agricultural commodities.
 
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
 from app.config.settings import settings
 
@@ -21,6 +22,11 @@ class MandiPriceService:
     
     BASE_URL = "https://api.data.gov.in/resource/9ef2731d-91d2-4581-adbc-a24ad7373c04"
     
+    # Shared by every instance (one per request): keeps connections to the
+    # API alive between polls instead of a new TCP + TLS handshake per call
+    _session = requests.Session()
+    _session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or getattr(settings, "OGD_INDIA_API_KEY", None)
         
@@ -44,7 +50,7 @@ class MandiPriceService:
             params["filters[state]"] = state
             
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
+            response = self._session.get(self.BASE_URL, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             return data.get("records", [])
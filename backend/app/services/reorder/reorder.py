@@ -1,11 +1,40 @@
+import numpy as np
 from datetime import datetime, date
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, load_only
 
 from app.models import Store, SKU, ReorderRecommendation, UrgencyLevel
 from app.services.forecasting import ForecasterService, calculate_velocity_change
 from app.schemas import ReorderItem, ReorderListResponse, ReorderSummary
 from app.config.settings import settings
+from app.services.cache import cache_delete
+
+
+# (urgency, reason template) per reorder rule, checked in this order
+REORDER_RULES = (
+    (UrgencyLevel.CRITICAL, "Out of stock! Immediate reorder needed."),
+    (UrgencyLevel.CRITICAL, "Stock-out risk: only {coverage} days of stock left."),
+    (UrgencyLevel.HIGH, "Low stock: {coverage} days remaining."),
+    (UrgencyLevel.HIGH, "{velocity:+.0f}% velocity increase vs last week."),
+    (UrgencyLevel.MEDIUM, "{velocity:+.0f}% velocity increase. Monitor closely."),
+    (UrgencyLevel.LOW, "Regular restock for {horizon}-day forecast."),
+)
+
+# Position in the reorder list by urgency (critical first)
+URGENCY_RANK = {
+    UrgencyLevel.CRITICAL: 0,
+    UrgencyLevel.HIGH: 1,
+    UrgencyLevel.MEDIUM: 2,
+    UrgencyLevel.LOW: 3
+}
+
+# URGENCY_RANK of each REORDER_RULES entry, so rule arrays sort directly
+_RULE_RANK = np.array([URGENCY_RANK[urgency] for urgency, _ in REORDER_RULES])
+
+# Days of stock cover splitting the coverage rules: under 2 days is a
+# stock-out risk, under 4 is low stock, past that velocity decides
+COVERAGE_BOUNDS = (2.0, 4.0)
 
 
 class ReorderService:
@@ -17,7 +46,8 @@ class ReorderService:
         self,
         store_id: str,
         horizon: int = 7,
-        threshold_velocity_pct: float = 20.0
+        threshold_velocity_pct: float = 20.0,
+        forecasts: Optional[dict] = None
     ) -> List[ReorderItem]:
         """
         Generate reorder recommendations for a store.
@@ -26,6 +56,8 @@ class ReorderService:
             store_id: Store identifier
             horizon: Forecast horizon in days
             threshold_velocity_pct: Minimum velocity change to flag
+            forecasts: forecast_store(store_id, horizon) output the caller
+                       already has for every SKU; computed here if omitted
             
         Returns:
             List of reorder recommendations
@@ -38,108 +70,134 @@ class ReorderService:
         skus = self.db.query(SKU).filter(SKU.store_id == store.id).all()
         
         # Get forecasts for all SKUs
-        forecasts = self.forecaster.forecast_store(store_id, horizon)
+        if forecasts is None:
+            forecasts = self.forecaster.forecast_store(store_id, horizon)
         
-        recommendations = []
+        skus = [sku for sku in skus if sku.sku_id in forecasts]
+        if not skus:
+            return []
         
-        for sku in skus:
-            if sku.sku_id not in forecasts:
-                continue
-            
-            sku_forecast = forecasts[sku.sku_id]
-            forecast_points = sku_forecast['forecasts']
-            
-            # Calculate total forecasted demand
-            total_demand = sum(fp.predicted_units for fp in forecast_points)
-            
-            # Get velocity change (Pre-computed in parallel worker)
-            velocity_change = sku_forecast.get('velocity_change', 0.0)
-            
-            # Calculate reorder quantity
-            reorder_qty, reason, urgency = self._calculate_reorder(
-                forecasted_demand=total_demand,
-                current_stock=sku.current_stock,
-                velocity_change=velocity_change,
-                threshold_velocity_pct=threshold_velocity_pct,
-                horizon=horizon
+        # Calculate total forecasted demand; cumsum adds each SKU's days in
+        # order, so totals match a plain sum() of the points
+        predicted = np.array([
+            [fp.predicted_units for fp in forecasts[sku.sku_id]['forecasts']]
+            for sku in skus
+        ], dtype=np.float64).reshape(len(skus), -1)
+        total_demand = np.cumsum(predicted, axis=1)[:, -1] if predicted.shape[1] else np.zeros(len(skus))
+        current_stock = np.array([sku.current_stock for sku in skus], dtype=np.int64)
+        
+        # Get velocity change (Pre-computed in parallel worker)
+        velocity_change = np.array(
+            [forecasts[sku.sku_id].get('velocity_change', 0.0) for sku in skus], dtype=np.float64
+        )
+        
+        # Calculate reorder quantity for every SKU at once
+        reorder_qty, coverage_days, rule = self._calculate_reorder(
+            forecasted_demand=total_demand,
+            current_stock=current_stock,
+            velocity_change=velocity_change,
+            threshold_velocity_pct=threshold_velocity_pct,
+            horizon=horizon
+        )
+        
+        # Only add if reorder needed, sorted by urgency (critical first);
+        # stable, so SKUs keep their order within an urgency level
+        needed = np.flatnonzero(reorder_qty > 0)
+        needed = needed[np.argsort(_RULE_RANK[rule[needed]], kind='stable')]
+        
+        recommendations = []
+        for i in needed.tolist():
+            sku = skus[i]
+            urgency, reason = self._reorder_reason(
+                int(rule[i]), float(coverage_days[i]), float(velocity_change[i]), horizon
             )
-            
-            # Only add if reorder needed
-            if reorder_qty > 0:
-                recommendations.append(ReorderItem(
-                    sku_id=sku.sku_id,
-                    sku_name=sku.sku_name,
-                    reorder_qty=reorder_qty,
-                    reason=reason,
-                    urgency=urgency,
-                    forecasted_demand=round(total_demand, 1),
-                    current_stock=sku.current_stock,
-                    velocity_change_pct=velocity_change
-                ))
-        
-        # Sort by urgency (critical first)
-        urgency_order = {
-            UrgencyLevel.CRITICAL: 0,
-            UrgencyLevel.HIGH: 1,
-            UrgencyLevel.MEDIUM: 2,
-            UrgencyLevel.LOW: 3
-        }
-        recommendations.sort(key=lambda x: urgency_order.get(x.urgency, 4))
+            recommendations.append(ReorderItem(
+                sku_id=sku.sku_id,
+                sku_name=sku.sku_name,
+                reorder_qty=int(reorder_qty[i]),
+                reason=reason,
+                urgency=urgency,
+                forecasted_demand=round(float(total_demand[i]), 1),
+                current_stock=sku.current_stock,
+                velocity_change_pct=forecasts[sku.sku_id].get('velocity_change', 0.0)
+            ))
         
         return recommendations
     
     def _calculate_reorder(
         self,
-        forecasted_demand: float,
-        current_stock: int,
-        velocity_change: float,
+        forecasted_demand: np.ndarray,
+        current_stock: np.ndarray,
+        velocity_change: np.ndarray,
         threshold_velocity_pct: float,
         horizon: int
     ) -> tuple:
         """
-        Calculate reorder quantity, reason, and urgency.
+        Calculate reorder quantity, stock coverage and urgency rule for
+        every SKU at once (one array element per SKU).
         
         Returns:
-            Tuple of (reorder_qty, reason, urgency)
+            Tuple of (reorder_qty, stock_coverage_days, rule), where rule
+            indexes REORDER_RULES
         """
-        # Safety stock: configurable multiplier
-        safety_stock = int(forecasted_demand * (settings.SAFETY_STOCK_MULTIPLIER - 1))
+        # Safety stock: configurable multiplier (int() truncation; demand >= 0)
+        safety_stock = np.trunc(forecasted_demand * (settings.SAFETY_STOCK_MULTIPLIER - 1))
         
         # Reorder formula
-        reorder_qty = max(0, int(
+        reorder_qty = np.maximum(0, np.trunc(
             forecasted_demand + safety_stock - current_stock
-        ))
+        )).astype(np.int64)
         
-        # Determine urgency and reason
-        stock_coverage_days = 0
-        if forecasted_demand > 0:
+        # Days the current stock lasts at the forecast rate (0 with no demand)
+        with np.errstate(divide='ignore', invalid='ignore'):
             daily_demand = forecasted_demand / horizon
-            stock_coverage_days = current_stock / daily_demand if daily_demand > 0 else float('inf')
+            stock_coverage_days = np.where(
+                forecasted_demand > 0,
+                np.where(daily_demand > 0, current_stock / daily_demand, np.inf),
+                0.0
+            )
+        
+        # First matching rule wins, as in REORDER_RULES order. Rather than a
+        # mask per rule, each band is the number of its boundaries a value
+        # clears (one compare each): coverage under 2 / under 4 / 4+ days
+        # maps to rules 1 / 2 / velocity, and velocity below half the
+        # threshold / below it / at or above it to rules 5 / 4 / 3. NaN
+        # clears nothing; a negative threshold leaves no half-threshold band
+        low_bound, high_bound = COVERAGE_BOUNDS
+        coverage_band = (
+            (stock_coverage_days >= low_bound).view(np.int8)
+            + (stock_coverage_days >= high_bound).view(np.int8)
+        )
+        velocity_band = (
+            (velocity_change >= min(threshold_velocity_pct / 2, threshold_velocity_pct)).view(np.int8)
+            + (velocity_change >= threshold_velocity_pct).view(np.int8)
+        )
+        rule = np.where(
+            current_stock == 0, 0,
+            np.where(coverage_band < 2, coverage_band + 1, 5 - velocity_band)
+        )
+        return reorder_qty, stock_coverage_days, rule
+    
+    def _reorder_reason(
+        self,
+        rule: int,
+        stock_coverage_days: float,
+        velocity_change: float,
+        horizon: int
+    ) -> tuple:
+        """
+        Urgency and human-readable reason for one SKU's REORDER_RULES index.
         
-        # Build reason and urgency
+        Returns:
+            Tuple of (urgency, reason)
+        """
         coverage_text = f"{min(99.9, stock_coverage_days):.1f}"
         if stock_coverage_days > 99: coverage_text = "99+"
-
-        if current_stock == 0:
-            urgency = UrgencyLevel.CRITICAL
-            reason = "Out of stock! Immediate reorder needed."
-        elif stock_coverage_days < 2:
-            urgency = UrgencyLevel.CRITICAL
-            reason = f"Stock-out risk: only {coverage_text} days of stock left."
-        elif stock_coverage_days < 4:
-            urgency = UrgencyLevel.HIGH
-            reason = f"Low stock: {coverage_text} days remaining."
-        elif velocity_change >= threshold_velocity_pct:
-            urgency = UrgencyLevel.HIGH
-            reason = f"{velocity_change:+.0f}% velocity increase vs last week."
-        elif velocity_change >= threshold_velocity_pct / 2:
-            urgency = UrgencyLevel.MEDIUM
-            reason = f"{velocity_change:+.0f}% velocity increase. Monitor closely."
-        else:
-            urgency = UrgencyLevel.LOW
-            reason = f"Regular restock for {horizon}-day forecast."
-        
-        return reorder_qty, reason, urgency
+        
+        urgency, template = REORDER_RULES[rule]
+        return urgency, template.format(
+            coverage=coverage_text, velocity=velocity_change, horizon=horizon
+        )
     
     def save_recommendations(self, store_id: str, recommendations: List[ReorderItem]) -> int:
         """
@@ -158,31 +216,35 @@ class ReorderService:
             ReorderRecommendation.is_active == True
         ).update({'is_active': False})
         
-        count = 0
+        # One lookup for every SKU, then one executemany insert
+        sku_map = dict(
+            self.db.query(SKU.sku_id, SKU.id).filter(SKU.store_id == store.id).all()
+        )
+        
+        rows = []
         for rec in recommendations:
-            sku = self.db.query(SKU).filter(
-                SKU.sku_id == rec.sku_id,
-                SKU.store_id == store.id
-            ).first()
-            
-            if not sku:
+            sku_db_id = sku_map.get(rec.sku_id)
+            if sku_db_id is None:
                 continue
             
-            db_rec = ReorderRecommendation(
-                store_id=store.id,
-                sku_id=sku.id,
-                reorder_qty=rec.reorder_qty,
-                reason=rec.reason,
-                urgency=UrgencyLevel[rec.urgency.upper()] if isinstance(rec.urgency, str) else rec.urgency,
-                forecasted_demand=rec.forecasted_demand,
-                current_stock=rec.current_stock,
-                velocity_change_pct=rec.velocity_change_pct,
-                is_active=True
-            )
-            self.db.add(db_rec)
-            count += 1
+            rows.append({
+                'store_id': store.id,
+                'sku_id': sku_db_id,
+                'reorder_qty': rec.reorder_qty,
+                'reason': rec.reason,
+                'urgency': UrgencyLevel[rec.urgency.upper()] if isinstance(rec.urgency, str) else rec.urgency,
+                'forecasted_demand': rec.forecasted_demand,
+                'current_stock': rec.current_stock,
+                'velocity_change_pct': rec.velocity_change_pct,
+                'is_active': True,
+            })
+        
+        if rows:
+            self.db.execute(insert(ReorderRecommendation.__table__), rows)
+        count = len(rows)
         
         self.db.commit()
+        cache_delete(f"reorder-summary:{store_id}")
         return count
     
     def get_summary(self, store_id: str) -> Optional[ReorderSummary]:
@@ -191,7 +253,10 @@ class ReorderService:
         if not store:
             return None
         
-        recs = self.db.query(ReorderRecommendation).filter(
+        # Only urgency is needed for the counts
+        recs = self.db.query(ReorderRecommendation).options(
+            load_only(ReorderRecommendation.urgency)
+        ).filter(
             ReorderRecommendation.store_id == store.id,
             ReorderRecommendation.is_active == True
         ).all()
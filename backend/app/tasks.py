@@ -20,9 +20,12 @@ def run_forecast_async(self, store_id: str, horizon: int = 7, sku_ids: list = No
         forecasts = service.forecast_store(store_id, horizon, sku_ids)
         service.save_forecasts(store_id, forecasts, horizon)
         
-        # 2. Regenerate Reorder Recommendations (chained)
+        # 2. Regenerate Reorder Recommendations (chained); reuse step 1's
+        # forecasts unless they only cover some of the SKUs
         reorder_service = ReorderService(db)
-        recommendations = reorder_service.generate_recommendations(store_id, horizon)
+        recommendations = reorder_service.generate_recommendations(
+            store_id, horizon, forecasts=None if sku_ids else forecasts
+        )
         reorder_service.save_recommendations(store_id, recommendations)
         
         return {
@@ -38,3 +41,12 @@ def run_forecast_async(self, store_id: str, horizon: int = 7, sku_ids: list = No
         raise e
     finally:
         db.close()
+
+
+@celery_app.task(bind=True, name="app.tasks.run_pipeline_async")
+def run_pipeline_async(self, store_id: str, horizon: int = 7):
+    """
+    Post-upload pipeline: forecast every SKU, then rebuild the reorder list.
+    Queued by /upload-sales so ingestion never forecasts in the web process.
+    """
+    return run_forecast_async(store_id, horizon)
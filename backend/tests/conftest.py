@@ -0,0 +1,38 @@
+import os
+
+# Importing app.* creates the database engine; tests don't need PostgreSQL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory database with every table created."""
+    from app.models import Base
+
+    # One shared connection, so route handlers on other threads see the data
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db):
+    """TestClient for the API, with get_db bound to the db fixture."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.models import get_db
+
+    app.dependency_overrides[get_db] = lambda: db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
@@ -0,0 +1,134 @@
+"""
+The numba ARIMA(2, d, 2) kernel (settings.ARIMA_BACKEND = "numba") against
+statsmodels, and the cases where it must hand back to statsmodels.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.arima.model import ARIMA
+
+from app.config.settings import settings
+from app.services.forecasting import arima
+from app.services.forecasting._arima_kernel import _admissible, _css, _nelder_mead, ar2ma2_forecast
+
+
+def simulate_arma(n, phi, theta, seed, level=20.0, burn_in=200):
+    """A seeded ARMA(2, 2) series with unit innovations around level."""
+    rng = np.random.default_rng(seed)
+    e = rng.normal(0, 1, n + burn_in)
+    w = np.zeros(n + burn_in)
+    for t in range(2, n + burn_in):
+        w[t] = phi[0] * w[t - 1] + phi[1] * w[t - 2] + e[t] + theta[0] * e[t - 1] + theta[1] * e[t - 2]
+    return w[burn_in:] + level
+
+
+def simulate_zero_start(n, params, seed):
+    """ARMA(2, 2) started from zero values and shocks, as _css assumes; also returns the shocks."""
+    phi1, phi2, theta1, theta2 = params
+    rng = np.random.default_rng(seed)
+    e = rng.normal(0, 1, n)
+    e[:2] = 0.0
+    w = np.zeros(n)
+    for t in range(2, n):
+        w[t] = phi1 * w[t - 1] + phi2 * w[t - 2] + e[t] + theta1 * e[t - 1] + theta2 * e[t - 2]
+    return w, e
+
+
+TRUE_PARAMS = np.array([0.5, -0.3, 0.4, 0.2])
+
+
+@pytest.mark.parametrize("params, expected", [
+    ((0.5, -0.3, 0.4, 0.2), True),
+    ((0.6, 0.4, 0.0, 0.0), False),    # phi1 + phi2 = 1
+    ((-0.6, 0.4, 0.0, 0.0), False),   # phi2 - phi1 = 1
+    ((0.0, -1.0, 0.0, 0.0), False),   # |phi2| = 1
+    ((0.0, 0.0, -0.6, -0.4), False),  # theta1 + theta2 = -1
+    ((0.0, 0.0, 0.6, -0.4), False),   # theta2 - theta1 = -1
+    ((0.0, 0.0, 0.0, 1.0), False),    # |theta2| = 1
+])
+def test_admissible_region(params, expected):
+    assert _admissible(np.array(params)) == expected
+
+
+def test_css_is_sum_of_innovations():
+    w, e = simulate_zero_start(500, TRUE_PARAMS, seed=0)
+    
+    assert _css(TRUE_PARAMS, w) == pytest.approx(np.sum(e[2:] ** 2))
+    assert _css(np.zeros(4), w) == pytest.approx(np.sum(w[2:] ** 2))
+    assert _css(np.array([0.6, 0.4, 0.0, 0.0]), w) == np.inf
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_nelder_mead_recovers_parameters(seed):
+    w, _ = simulate_zero_start(3000, TRUE_PARAMS, seed)
+    
+    params, loss = _nelder_mead(np.zeros(4), w)
+    
+    np.testing.assert_allclose(params, TRUE_PARAMS, atol=0.15)
+    assert _admissible(params)
+    assert loss == pytest.approx(_css(params, w))
+    # A minimum: no worse than the parameters the series was built from
+    assert loss <= _css(TRUE_PARAMS, w)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+@pytest.mark.parametrize("d", [0, 1])
+def test_matches_statsmodels(seed, d):
+    y = simulate_arma(180, (0.5, -0.3), (0.4, 0.2), seed)
+    if d == 1:
+        y = 50 + np.cumsum(y - 20) / 5
+    
+    mean, lower, upper, ok = ar2ma2_forecast(y, d, 7)
+    
+    expected = ARIMA(y, order=(2, d, 2)).fit().get_forecast(steps=7)
+    conf_int = expected.conf_int(alpha=0.05)
+    assert ok
+    np.testing.assert_allclose(mean, expected.predicted_mean, atol=0.25)
+    np.testing.assert_allclose(upper - lower, conf_int[:, 1] - conf_int[:, 0], rtol=0.15)
+    np.testing.assert_allclose((lower + upper) / 2, mean)
+
+
+def test_rejects_non_stationary_ar():
+    # Oscillating growth: the fitted phi1 + phi2 is well above 1
+    y = (-1.08) ** np.arange(120.0)
+    assert not ar2ma2_forecast(y, 0, 7)[3]
+
+
+def test_rejects_non_invertible_ma():
+    # Twice-differenced white noise has MA roots on/outside the unit circle
+    y = np.random.default_rng(0).normal(10, 1, 120)
+    assert not ar2ma2_forecast(y, 2, 7)[3]
+
+
+@pytest.mark.parametrize("y", [
+    np.r_[np.random.default_rng(0).normal(10, 1, 119), np.nan],
+    np.r_[np.random.default_rng(0).normal(10, 1, 119), np.inf],
+    np.random.default_rng(0).normal(0, 1, 120) * 1e160,  # squares overflow
+])
+def test_rejects_non_finite(y):
+    assert not ar2ma2_forecast(y, 0, 7)[3]
+
+
+def test_rejects_short_series():
+    y = np.random.default_rng(0).normal(10, 1, 20)
+    assert not ar2ma2_forecast(y, 0, 7)[3]
+
+
+@pytest.mark.parametrize("backend, kernel_calls", [("statsmodels", 0), ("numba", 1)])
+def test_kernel_only_runs_when_selected(monkeypatch, backend, kernel_calls):
+    calls = []
+    
+    def spy(*args):
+        calls.append(args)
+        return ar2ma2_forecast(*args)
+    
+    monkeypatch.setattr(settings, "ARIMA_BACKEND", backend)
+    monkeypatch.setattr(arima, "ar2ma2_forecast", spy)
+    y = simulate_arma(90, (0.5, -0.3), (0.4, 0.2), seed=0)
+    data = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=len(y)), "units_sold": y})
+    
+    points = arima.ARIMAForecaster(data).forecast(7)
+    
+    assert len(points) == 7
+    assert len(calls) == kernel_calls
@@ -0,0 +1,95 @@
+"""
+CSVUploadService deduplication: repeated (store, SKU, date) rows keep the
+first copy in file order, within one parsed block and across blocks.
+"""
+
+from datetime import date
+from io import BytesIO
+
+import pytest
+
+from app.models import SalesTransaction
+from app.services import csv_upload
+from app.services.csv_upload import CSVUploadService, iter_csv_frames
+
+
+HEADER = "store_id,sku_id,sku_name,date,units_sold,price\n"
+
+
+def upload(db, lines):
+    result = CSVUploadService(db).process_csv(BytesIO((HEADER + "".join(lines)).encode()))
+    assert result.success, result.errors
+    return result
+
+
+def stored_units(db):
+    """{(sku_id, date): units_sold} of every stored transaction."""
+    return {
+        (tx.sku.sku_id, tx.date): tx.units_sold
+        for tx in db.query(SalesTransaction).all()
+    }
+
+
+def test_duplicate_rows_in_one_block_keep_the_first(db):
+    result = upload(db, [
+        "S1,A,Rice,2026-01-01,5,40\n",
+        "S1,B,Dal,2026-01-01,2,90\n",
+        "S1,A,Rice,2026-01-01,9,40\n",
+        "S1,A,Rice,2026-01-02,3,40\n",
+        "S1,B,Dal,2026-01-01,7,90\n",
+    ])
+
+    # Repeats still count as processed rows
+    assert result.rows_processed == 5
+    assert stored_units(db) == {
+        ("A", date(2026, 1, 1)): 5,
+        ("B", date(2026, 1, 1)): 2,
+        ("A", date(2026, 1, 2)): 3,
+    }
+
+
+
+ROWS = [
+    "S1,A,Rice,2026-01-01,5,40\n",
+    "S1,A,Rice,2026-01-02,3,40\n",
+    "S1,B,Dal,2026-01-01,2,90\n",
+    "S1,A,Rice,2026-01-01,9,40\n",
+    "S1,B,Dal,2026-01-01,7,90\n",
+    "S1,B,Dal,2026-01-03,4,90\n",
+]
+
+
+def test_duplicate_rows_across_blocks_keep_the_first(db, monkeypatch):
+    # A couple of rows per pyarrow block
+    monkeypatch.setattr(csv_upload, "CSV_BLOCK_SIZE", 64)
+    assert len(list(iter_csv_frames(HEADER + "".join(ROWS)))) > 2
+
+    result = upload(db, ROWS)
+
+    assert result.rows_processed == 6
+    assert stored_units(db) == {
+        ("A", date(2026, 1, 1)): 5,
+        ("A", date(2026, 1, 2)): 3,
+        ("B", date(2026, 1, 1)): 2,
+        ("B", date(2026, 1, 3)): 4,
+    }
+
+
+def test_duplicate_rows_across_chunks_keep_the_first_after_type_drift(db, monkeypatch):
+    # Price turns to text after the first block, so pyarrow gives up and
+    # pandas re-reads the file two rows at a time
+    monkeypatch.setattr(csv_upload, "CSV_BLOCK_SIZE", 64)
+    monkeypatch.setattr(csv_upload, "CSV_CHUNK_ROWS", 2)
+    rows = ROWS[:4] + ["S1,B,Dal,2026-01-01,7,Rs 90\n", "S1,B,Dal,2026-01-03,4,Rs 90\n"]
+    with pytest.raises(csv_upload.ARROW_READ_ERRORS):
+        list(iter_csv_frames(HEADER + "".join(rows)))
+
+    result = upload(db, rows)
+
+    assert result.rows_processed == 6
+    assert stored_units(db) == {
+        ("A", date(2026, 1, 1)): 5,
+        ("A", date(2026, 1, 2)): 3,
+        ("B", date(2026, 1, 1)): 2,
+        ("B", date(2026, 1, 3)): 4,
+    }
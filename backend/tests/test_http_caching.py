@@ -0,0 +1,60 @@
+"""
+ETag revalidation on /stores, /stores/{id} and /festivals: a matching
+If-None-Match gets a bodiless 304, and any change yields a new ETag.
+"""
+
+from datetime import date
+
+import pytest
+
+from app.models import Festival, Store
+
+
+@pytest.fixture
+def store(db):
+    store = Store(store_id="S1", name="Store S1")
+    db.add(store)
+    db.commit()
+    return store
+
+
+@pytest.mark.parametrize("path", ["/api/stores", "/api/stores/S1", "/api/festivals"])
+def test_matching_etag_gets_304(client, store, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+
+    revalidated = client.get(path, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+
+@pytest.mark.parametrize("path", ["/api/stores", "/api/festivals"])
+def test_stale_etag_gets_200(client, store, path):
+    response = client.get(path, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert response.headers["etag"] != '"stale"'
+
+
+def test_new_store_changes_the_list_etag(client, db, store):
+    etag = client.get("/api/stores").headers["etag"]
+
+    db.add(Store(store_id="S2", name="Store S2"))
+    db.commit()
+
+    response = client.get("/api/stores", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_new_festival_changes_the_list_etag(client, db):
+    etag = client.get("/api/festivals").headers["etag"]
+
+    db.add(Festival(name="Diwali", date=date(2026, 11, 8), region="All India", impact_multiplier=2.5))
+    db.commit()
+
+    response = client.get("/api/festivals", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [f["name"] for f in response.json()] == ["Diwali"]
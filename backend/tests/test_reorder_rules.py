@@ -0,0 +1,106 @@
+"""
+The vectorized ReorderService._calculate_reorder against the per-SKU
+if-chain it replaced: same reorder quantity, coverage, urgency and reason.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from app.config.settings import settings
+from app.models import UrgencyLevel
+from app.services.reorder.reorder import REORDER_RULES, ReorderService
+
+
+HORIZON = 7
+
+
+def reference_reorder(forecasted_demand, current_stock, velocity_change, threshold_velocity_pct, horizon):
+    """The original scalar rules, one SKU at a time."""
+    safety_stock = int(forecasted_demand * (settings.SAFETY_STOCK_MULTIPLIER - 1))
+    reorder_qty = max(0, int(forecasted_demand + safety_stock - current_stock))
+
+    stock_coverage_days = 0
+    if forecasted_demand > 0:
+        daily_demand = forecasted_demand / horizon
+        stock_coverage_days = current_stock / daily_demand if daily_demand > 0 else float('inf')
+
+    coverage_text = f"{min(99.9, stock_coverage_days):.1f}"
+    if stock_coverage_days > 99: coverage_text = "99+"
+
+    if current_stock == 0:
+        urgency = UrgencyLevel.CRITICAL
+        reason = "Out of stock! Immediate reorder needed."
+    elif stock_coverage_days < 2:
+        urgency = UrgencyLevel.CRITICAL
+        reason = f"Stock-out risk: only {coverage_text} days of stock left."
+    elif stock_coverage_days < 4:
+        urgency = UrgencyLevel.HIGH
+        reason = f"Low stock: {coverage_text} days remaining."
+    elif velocity_change >= threshold_velocity_pct:
+        urgency = UrgencyLevel.HIGH
+        reason = f"{velocity_change:+.0f}% velocity increase vs last week."
+    elif velocity_change >= threshold_velocity_pct / 2:
+        urgency = UrgencyLevel.MEDIUM
+        reason = f"{velocity_change:+.0f}% velocity increase. Monitor closely."
+    else:
+        urgency = UrgencyLevel.LOW
+        reason = f"Regular restock for {horizon}-day forecast."
+
+    return reorder_qty, stock_coverage_days, urgency, reason
+
+
+# Demand and stock around the coverage boundaries (2 and 4 days at
+# HORIZON), plus zero stock and zero demand
+DEMANDS = [0.0, 3.5, 7.0, 10.0, 14.0, 35.0, 123.4]
+STOCKS = [0, 1, 2, 4, 7, 8, 20, 500]
+# Velocity on, just under and between the threshold / half-threshold
+# boundaries for both signs of threshold, and NaN
+VELOCITIES = [float('nan'), -25.0, -20.0, -12.0, -10.0, -5.0, 0.0, 5.0, 9.9, 10.0, 19.9, 20.0, 150.0]
+THRESHOLDS = [20.0, 0.0, -10.0, -20.0]
+
+
+@pytest.fixture
+def service():
+    return ReorderService(None)
+
+
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+def test_matches_reference_rules(service, threshold):
+    cases = list(itertools.product(DEMANDS, STOCKS, VELOCITIES))
+    demand, stock, velocity = (np.array(column, dtype=float) for column in zip(*cases))
+
+    reorder_qty, coverage, rule = service._calculate_reorder(
+        forecasted_demand=demand,
+        current_stock=stock.astype(np.int64),
+        velocity_change=velocity,
+        threshold_velocity_pct=threshold,
+        horizon=HORIZON
+    )
+
+    for i, (d, s, v) in enumerate(cases):
+        expected_qty, expected_coverage, expected_urgency, expected_reason = reference_reorder(
+            d, int(s), v, threshold, HORIZON
+        )
+        urgency, reason = service._reorder_reason(int(rule[i]), float(coverage[i]), v, HORIZON)
+        case = f"demand={d} stock={s} velocity={v} threshold={threshold}"
+        assert reorder_qty[i] == expected_qty, case
+        assert coverage[i] == expected_coverage, case
+        assert urgency == expected_urgency, case
+        assert reason == expected_reason, case
+
+
+def test_zero_stock_is_out_of_stock_even_without_demand(service):
+    _, coverage, rule = service._calculate_reorder(
+        np.array([0.0, 10.0]), np.array([0, 0]), np.array([0.0, 0.0]), 20.0, HORIZON
+    )
+    assert rule.tolist() == [0, 0]
+    assert coverage.tolist() == [0.0, 0.0]
+
+
+def test_nan_velocity_falls_through_to_regular_restock(service):
+    _, _, rule = service._calculate_reorder(
+        np.array([7.0]), np.array([50]), np.array([np.nan]), 20.0, HORIZON
+    )
+    assert REORDER_RULES[rule[0]][0] == UrgencyLevel.LOW
@@ -0,0 +1,94 @@
+"""
+Redis-cached /reorder-summary and /festivals/impact: writes through
+ReorderService and FestivalService must drop the cached keys.
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.api import routes
+from app.models import SKU, Store
+from app.schemas import ReorderItem, UrgencyLevel
+from app.services import cache
+from app.services.festivals import FestivalService
+from app.services.reorder.reorder import ReorderService
+
+
+class FakeRedis:
+    """The slice of redis.Redis that app.services.cache uses, in a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match, count=None):
+        prefix = match.rstrip("*")
+        return [key for key in self.data if key.startswith(prefix)]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "_get_client", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def store(db, monkeypatch):
+    store = Store(store_id="S1", name="Store S1")
+    db.add(store)
+    db.flush()
+    db.add(SKU(sku_id="A", sku_name="Rice", store_id=store.id, current_stock=2))
+    db.commit()
+    # The store lookup opens its own sessions; point them at the test database
+    monkeypatch.setattr(routes, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(routes, "_store_lookup_cache", {})
+    return store
+
+
+def test_save_recommendations_clears_reorder_summary(client, db, redis, store):
+    assert client.get("/api/reorder-summary", params={"store_id": "S1"}).json()["total_items"] == 0
+    assert "reorder-summary:S1" in redis.data
+
+    ReorderService(db).save_recommendations("S1", [ReorderItem(
+        sku_id="A", sku_name="Rice", reorder_qty=10, reason="Low stock",
+        urgency=UrgencyLevel.HIGH, forecasted_demand=12.0, current_stock=2
+    )])
+
+    assert "reorder-summary:S1" not in redis.data
+    summary = client.get("/api/reorder-summary", params={"store_id": "S1"}).json()
+    assert (summary["total_items"], summary["high"]) == (1, 1)
+
+
+def test_add_festival_clears_festival_impact(client, db, redis):
+    params = {"date": "2026-11-08"}
+    assert client.get("/api/festivals/impact", params=params).json()["impact_multiplier"] == 1.0
+    assert "festival-impact:2026-11-08" in redis.data
+
+    response = client.post("/api/festivals", json={
+        "name": "Diwali", "date": "2026-11-08", "region": "All India", "impact_multiplier": 2.5
+    })
+    assert response.status_code == 200
+
+    assert not any(key.startswith("festival-impact:") for key in redis.data)
+    assert client.get("/api/festivals/impact", params=params).json()["impact_multiplier"] == 2.5
+
+
+def test_seeding_festivals_clears_festival_impact(db, redis):
+    cache.cache_set("festival-impact:2026-10-24", 1.0, ttl=60)
+
+    assert FestivalService(db).seed_default_festivals(2026) > 0
+
+    assert "festival-impact:2026-10-24" not in redis.data
+    assert FestivalService(db).get_impact_multiplier(date(2026, 10, 24)) == 2.5